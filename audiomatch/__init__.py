@@ -0,0 +1,22 @@
+"""Vectorized audio pattern matching shared by the fftconvolve/spectrogram scripts."""
+from .envelope import energy_envelope
+from .stats import BlockedPrefixSums, sliding_window_sums, window_sums_error
+from .ncc import (cross_correlate_valid, envelope_match,
+                  normalize_correlation, normalized_cross_correlation)
+from .spectro import spectrogram_match
+from .stream import (StreamingNCC, StreamingPeakPicker, stream_matches,
+                     iter_audio_blocks, iter_ffmpeg_blocks, read_audio)
+from .batch import SearchSignal, search_patterns
+from .cache import AudioCache, default_cache, file_digest
+from .decode import decode_cached, decode_many, decode_window, ffmpeg_decode, probe_duration
+from .coarse import coarse_to_fine_search
+from .matcher import Matcher
+from .shard import sharded_search
+from .peaks import local_maxima, select_by_distance, top_k_peaks
+from .fingerprint import FingerprintIndex, fingerprint
+from .live import LiveDetector, MatchEvent
+from .features import match_features, peak_amplitudes
+from .fft import FFTWBackend, ScipyBackend, get_backend
+from .stretch import scaled_variants, stretch_search
+from .results import ResultStore, incremental_search
+from .vad import active_regions, pruned_search
@@ -0,0 +1,127 @@
+"""
+Search one pattern in many audio files within a single process:
+
+    python -m audiomatch PATTERN FILE [FILE ...] [--sr 4000] [--json]
+
+The pattern is decoded and prepared once; files are decoded by a small ffmpeg
+pool while earlier ones are being searched.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import default_cache
+from .decode import decode_cached
+from .matcher import Matcher
+from .results import ResultStore, incremental_search
+from .shard import sharded_search
+from .stretch import stretch_search
+from .vad import pruned_search
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m audiomatch",
+                                     description="Find occurrences of an audio pattern in audio files.")
+    parser.add_argument("pattern", help="pattern audio file")
+    parser.add_argument("files", nargs="+", help="audio files to search")
+    parser.add_argument("--sr", type=int, default=4000, help="working sample rate (default 4000)")
+    parser.add_argument("--height", type=float, default=0.7, help="minimum NCC of a match")
+    parser.add_argument("--distance-factor", type=float, default=0.25,
+                        help="minimum distance between matches, in pattern lengths")
+    parser.add_argument("--no-normalize", action="store_true", help="skip peak normalization")
+    parser.add_argument("--no-cache", action="store_true", help="always decode, bypassing the on-disk cache")
+    parser.add_argument("--decoders", type=int, default=min(4, os.cpu_count() or 1),
+                        help="files decoded concurrently")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes sharing the NCC of each file (0: one per core)")
+    parser.add_argument("--fft", default="scipy", choices=["scipy", "fftw", "auto"],
+                        help="FFT backend (fftw needs pyFFTW; auto uses it when installed)")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="score in chunks through fixed buffers (memory about the size of the decoded file)")
+    parser.add_argument("--stretch", type=float, default=0.0, metavar="FRACTION",
+                        help="also try the pattern time-scaled by up to +-FRACTION in 2%% steps (e.g. 0.1)")
+    parser.add_argument("--skip-silence", action="store_true",
+                        help="correlate only the audible regions of each file (reports the skipped spans)")
+    parser.add_argument("--results", metavar="JSONL",
+                        help="record matches and coverage there; grown files are only searched in their new tail")
+    parser.add_argument("--json", action="store_true", help="one JSON object per file on stdout")
+    args = parser.parse_args(argv)
+    if args.results:
+        ignored = [flag for flag, used in (("--stretch", args.stretch), ("--skip-silence", args.skip_silence),
+                                           ("--workers", args.workers != 1), ("--low-memory", args.low_memory))
+                   if used]
+        if ignored:
+            parser.error(f"--results searches the whole signal in one process; it cannot be combined "
+                         f"with {', '.join(ignored)}")
+    if args.skip_silence:
+        ignored = [flag for flag, used in (("--stretch", args.stretch), ("--workers", args.workers != 1),
+                                           ("--low-memory", args.low_memory)) if used]
+        if ignored:
+            parser.error(f"--skip-silence scores its regions in one process; it cannot be combined "
+                         f"with {', '.join(ignored)}")
+
+    cache = None if args.no_cache else default_cache()
+    pattern = decode_cached(args.pattern, args.sr, cache)
+    matcher = Matcher(pattern, args.sr, height=args.height, distance_factor=args.distance_factor,
+                      normalize=not args.no_normalize, backend=args.fft, low_memory=args.low_memory)
+    steps = int(round(args.stretch / 0.02))
+    scales = tuple(round(1 + 0.02 * k, 2) for k in range(-steps, steps + 1))
+
+    store = ResultStore(args.results) if args.results else None
+
+    def search(path, samples):
+        """(matches, stats); stats is None unless silence was skipped."""
+        if store is not None:
+            records = incremental_search(store, matcher, os.path.abspath(path), samples)
+            return [(r["start"], r["end"], r["similarity"], r["rms"]) for r in records], None
+        if steps:
+            return stretch_search(matcher.prepare(pattern), matcher.prepare(samples), args.sr, scales,
+                                  height=args.height, distance_factor=args.distance_factor), None
+        if args.skip_silence:
+            return pruned_search(matcher, samples)
+        if args.workers == 1 or args.low_memory:
+            return matcher.search(samples), None
+        return sharded_search(matcher, samples, args.workers or None), None
+
+    status = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.decoders)) as pool:
+        # Decode at most `decoders` files ahead of the search, so memory does not grow with the file list
+        queued = iter(args.files)
+        pending = deque()
+        for path in queued:
+            pending.append((path, pool.submit(decode_cached, path, args.sr, cache)))
+            if len(pending) >= max(1, args.decoders):
+                break
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(queued, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(decode_cached, next_path, args.sr, cache)))
+            t_start = time.time()
+            try:
+                matches, stats = search(path, future.result())
+            except Exception as e:
+                print(f"Error processing {path}: {e}", file=sys.stderr)
+                status = 1
+                continue
+            if args.json:
+                fields = ("start", "end", "similarity", "rms", "scale")
+                record = {"file": path, "matches": [dict(zip(fields, match)) for match in matches]}
+                if stats is not None:
+                    record["stats"] = stats
+                print(json.dumps(record))
+                continue
+            print(f"{path}: {len(matches)} match(es) in {time.time() - t_start:.2f}s")
+            if stats is not None:
+                print(f"  Skipped {stats['skipped_seconds']:.2f}s of silence ({100 * stats['skipped_fraction']:.0f}%) "
+                      f"in {len(stats['skipped'])} span(s)")
+            for i, (start, end, sim, rms_val, *scale) in enumerate(matches):
+                print(f"  Match {i+1}: Start = {start:.2f}s, End = {end:.2f}s, Sim = {sim:.2f}, RMS = {rms_val:.4f}"
+                      + (f", Scale = {scale[0]:.2f}" if scale else ""))
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
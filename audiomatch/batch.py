@@ -0,0 +1,97 @@
+import numpy as np
+from scipy import fft as sp_fft
+
+from .ncc import normalize_correlation
+from .stats import BlockedPrefixSums
+from .stream import StreamingPeakPicker
+
+GROUP_RATIO = 2.0  # patterns within this length ratio share one FFT size
+BLOCK_FACTOR = 4   # block FFT length is about BLOCK_FACTOR x the longest pattern of a group
+
+class SearchSignal:
+    """
+    One search signal prepared for many patterns: block-anchored prefix sums give
+    the window statistics of any pattern length without touching the samples again.
+    """
+    def __init__(self, search):
+        self.samples = np.asarray(search, dtype=np.float32)
+        self._prefix = BlockedPrefixSums(self.samples)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def window_sums(self, m, start=0, count=None):
+        """Sum and sum of squares of the length-m windows starting at start .. start+count-1."""
+        return self._prefix.window_sums(m, start, count)
+
+    def range_sums(self, lo, hi):
+        """Sum and sum of squares of samples[lo:hi] for arrays of bounds."""
+        return self._prefix.range_sums(lo, hi)
+
+def group_by_length(lengths, ratio=GROUP_RATIO):
+    """Indices of lengths grouped so that max/min within a group stays below ratio."""
+    groups = []
+    for idx in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+        if groups and lengths[idx] < ratio * lengths[groups[-1][0]]:
+            groups[-1].append(idx)
+        else:
+            groups.append([idx])
+    return groups
+
+def search_patterns(patterns, search, sr, height=0.7, distance_factor=0.25):
+    """
+    NCC search of many patterns in one signal.
+    patterns: dict of name -> samples (or a list, named by position).
+    Returns {name: [(start_time, end_time, similarity, rms), ...]}.
+
+    Patterns of similar length share one block FFT size: each search block is
+    transformed once per group, multiplied by every pattern spectrum of the group
+    and brought back with a single batched inverse FFT. Window statistics come from
+    the shared prefix sums, so per-pattern cost is one spectrum product and inverse FFT.
+    """
+    if not isinstance(patterns, dict):
+        patterns = dict(enumerate(patterns))
+    signal = search if isinstance(search, SearchSignal) else SearchSignal(search)
+    n = len(signal)
+
+    names = list(patterns)
+    arrays = [np.asarray(patterns[name], dtype=np.float64) for name in names]
+    results = {name: [] for name in names}
+
+    for group in group_by_length([len(a) for a in arrays]):
+        members = []
+        for i in group:
+            pattern_centered = arrays[i] - arrays[i].mean() if len(arrays[i]) else arrays[i]
+            # Empty, too long or silent/constant patterns cannot match
+            if 0 < len(pattern_centered) <= n and np.std(pattern_centered) >= 1e-9:
+                members.append((i, pattern_centered))
+        if not members:
+            continue
+
+        m_max = max(len(pc) for _, pc in members)
+        m_min = min(len(pc) for _, pc in members)
+        nfft = sp_fft.next_fast_len(BLOCK_FACTOR * m_max, real=True)
+        step = nfft - m_max + 1
+        pattern_specs = np.stack([sp_fft.rfft(pc[::-1], nfft) for _, pc in members])
+        energies = [np.sum(pc ** 2) for _, pc in members]
+        pickers = [StreamingPeakPicker(height, max(1, distance_factor * len(pc))) for _, pc in members]
+        peaks = [[] for _ in members]
+
+        for start in range(0, n - m_min + 1, step):
+            block_spec = sp_fft.rfft(signal.samples[start : start + nfft], nfft, workers=-1)
+            block_corr = sp_fft.irfft(pattern_specs * block_spec, nfft, axis=-1, workers=-1)
+            for k, (_, pc) in enumerate(members):
+                m = len(pc)
+                count = min(step, n - m + 1 - start)
+                if count <= 0:
+                    continue
+                sums, sums_sq = signal.window_sums(m, start, count)
+                ncc = normalize_correlation(block_corr[k, m - 1 : m - 1 + count], sums, sums_sq, m, energies[k])
+                peaks[k] += pickers[k].push(start, ncc, sums_sq)
+
+        for k, (i, pc) in enumerate(members):
+            m = len(pc)
+            peaks[k] += pickers[k].flush()
+            results[names[i]] = [(p / sr, (p + m) / sr, sim, float(np.sqrt(sum_sq / m)))
+                                 for p, sim, sum_sq in peaks[k]]
+    return results
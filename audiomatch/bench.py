@@ -0,0 +1,340 @@
+"""
+Benchmark of the audio matching variants on a fixed synthetic workload.
+
+    python -m audiomatch.bench --duration 600 --out bench.json
+
+The legacy scripts run their whole pipeline at import time, so each one is
+represented here by an adapter that reproduces its correlation, normalization
+and peak-picking rules on in-memory arrays (decoding is not benchmarked).
+Every method runs in a fresh process so its peak RSS is its own; since the
+workload is generated in that process too, the method's own peak allocation
+is also reported (tracemalloc, which NumPy buffers are visible to), in MB and
+as a multiple of the search signal's size.
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import queue as queue_module
+import sys
+import time
+import tracemalloc
+import numpy as np
+from scipy.signal import fftconvolve, find_peaks, spectrogram
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+# ---- Synthetic workload ----
+
+def speech_like(rng, n, sr):
+    """Noise and a few harmonics under a syllable-rate (~5 Hz) random envelope."""
+    hop = max(1, sr // 20)
+    env = np.repeat(rng.random(n // hop + 1) ** 2, hop)[:n]
+    t = np.arange(n) / sr
+    f0 = rng.uniform(90, 220)
+    voiced = sum(np.sin(2 * np.pi * k * f0 * t + rng.uniform(0, 2 * np.pi)) / k for k in range(1, 5))
+    return ((0.6 * rng.standard_normal(n) + voiced) * env).astype(np.float32)
+
+SILENCE_SECONDS = 5.0  # length of the pauses of a workload with silence
+
+def make_workload(seed=0, sr=4000, duration=600.0, pattern_seconds=2.0, copies=6,
+                  noise=0.05, gain_range=(0.5, 1.5), silence=0.0):
+    """
+    Deterministic (pattern, search, true_offsets): `copies` scaled copies of the
+    pattern planted at non-overlapping random offsets in speech-like background,
+    plus white noise of relative level `noise`. A `silence` fraction of the search,
+    in SILENCE_SECONDS pauses away from the copies, is attenuated by 60 dB.
+    """
+    rng = np.random.default_rng(seed)
+    m = int(pattern_seconds * sr)
+    n = int(duration * sr)
+    pattern = speech_like(rng, m, sr)
+    search = 0.5 * speech_like(rng, n, sr)
+    slots = rng.choice(n // (2 * m) - 1, size=copies, replace=False)
+    offsets = np.sort(slots * 2 * m + rng.integers(0, m, size=copies))
+    for off in offsets:
+        search[off : off + m] = pattern * rng.uniform(*gain_range)
+    search += noise * rng.standard_normal(n).astype(np.float32)
+    if silence > 0:
+        gap = int(SILENCE_SECONDS * sr)
+        quiet = np.repeat(rng.random(n // gap + 1) < silence, gap)[:n]
+        for off in offsets:
+            quiet[off : off + m] = False
+        search[quiet] *= 1e-3
+    return pattern, search.astype(np.float32), offsets
+
+# ---- Methods: each returns detected start offsets in samples ----
+
+def method_fftconvolve(pattern, search, sr):
+    """fftconvolve.py: raw correlation / pattern energy, height 0.5, distance 0.25 M."""
+    correlation = fftconvolve(search, pattern[::-1], mode='valid') / np.sum(pattern ** 2)
+    peaks, _ = find_peaks(correlation, height=0.5, distance=0.25 * len(pattern))
+    return peaks
+
+def method_fftconvolve_resampy(pattern, search, sr):
+    """fftconvolve-resampy-soundfile.py: same correlation, distance M."""
+    correlation = fftconvolve(search, pattern[::-1], mode='valid') / np.sum(pattern ** 2)
+    peaks, _ = find_peaks(correlation, height=0.5, distance=len(pattern))
+    return peaks
+
+def method_fftconvolve_plot_s2(pattern, search, sr):
+    """fftconvolve-plot-s2.py: correlation / autocorrelation peak, threshold 0.1, distance 0.5 M."""
+    correlation = fftconvolve(search, pattern[::-1], mode='valid')
+    auto_corr = fftconvolve(pattern, pattern[::-1], mode='valid')
+    peaks, _ = find_peaks(correlation / auto_corr[0], height=0.1, distance=0.5 * len(pattern))
+    return peaks
+
+def method_fftconvolve_improved(pattern, search, sr):
+    """fftconvolve-improved.py: NCC with three fftconvolve calls."""
+    m = len(pattern)
+    pattern_centered = pattern - np.mean(pattern)
+    conv = fftconvolve(search, pattern_centered[::-1], mode='valid')
+    window = np.ones(m, dtype=np.float32)
+    sliding_sum = fftconvolve(search, window, mode='valid')
+    sliding_sum_squares = fftconvolve(search ** 2, window, mode='valid')
+    local_mean = sliding_sum / m
+    local_variance = (sliding_sum_squares / m) - (local_mean ** 2)
+    with np.errstate(invalid='ignore'):
+        denominator = np.sqrt(local_variance * m) * np.sqrt(np.sum(pattern_centered ** 2)) + 1e-10
+        ncc = np.nan_to_num(conv / denominator)
+    peaks, _ = find_peaks(ncc, height=0.7, distance=0.25 * m)
+    return peaks
+
+def method_ncc_cumsum(pattern, search, sr):
+    """fftconvol-with-soundfile.py: fftconvolve numerator + prefix-sum window statistics."""
+    from .ncc import normalized_cross_correlation
+    ncc = normalized_cross_correlation(search, pattern)
+    peaks, _ = find_peaks(ncc, height=0.7, distance=max(1, 0.25 * len(pattern)))
+    return peaks
+
+def method_envelope(pattern, search, sr, top_n=6):
+    """loudness_pattern_spectrogram.py: envelope NCC, top-N local maxima."""
+    from .envelope import energy_envelope
+    from .ncc import envelope_match
+    from .peaks import top_k_peaks
+    scores = envelope_match(energy_envelope(pattern), energy_envelope(search))
+    return top_k_peaks(scores, top_n) * 256
+
+def method_spectrogram(pattern, search, sr, nperseg=1024, noverlap=512, threshold=0.8):
+    """spectrogram_original.py: log-spectrogram 2-D NCC, min-max normalized, distance w."""
+    from .spectro import spectrogram_match
+    pat = np.log10(spectrogram(pattern, fs=sr, nperseg=nperseg, noverlap=noverlap)[2] + 1e-10)
+    src = np.log10(spectrogram(search, fs=sr, nperseg=nperseg, noverlap=noverlap)[2] + 1e-10)
+    sc = spectrogram_match(pat, src)
+    if (rng := np.ptp(sc)) > 0:
+        sc = (sc - sc.min()) / rng
+    peaks, _ = find_peaks(sc, height=threshold, distance=pat.shape[1])
+    return peaks * (nperseg - noverlap)
+
+def method_streaming(pattern, search, sr, block_size=1 << 16):
+    """fftconvol-streaming.py: overlap-save blocks with incremental peak picking."""
+    from .stream import stream_matches
+    blocks = (search[i : i + block_size] for i in range(0, len(search), block_size))
+    return np.array([round(start * sr) for start, _, _, _ in stream_matches(pattern, blocks, sr)])
+
+def method_batch(pattern, search, sr):
+    """fftconvol-multi-pattern.py with a single pattern."""
+    from .batch import search_patterns
+    return np.array([round(start * sr) for start, _, _, _ in search_patterns([pattern], search, sr)[0]])
+
+def method_coarse(pattern, search, sr):
+    """Coarse-to-fine envelope search refined with the full-rate NCC."""
+    from .coarse import coarse_to_fine_search
+    matches, _ = coarse_to_fine_search(pattern, search, sr)
+    return np.array([round(start * sr) for start, _, _, _ in matches])
+
+def method_sharded(pattern, search, sr):
+    """Matcher NCC sharded over one process per core (same matches as a single process)."""
+    from .matcher import Matcher
+    from .shard import sharded_search
+    matches = sharded_search(Matcher(pattern, sr, normalize=False), search)
+    return np.array([round(start * sr) for start, _, _, _ in matches])
+
+def method_matcher(pattern, search, sr, backend="scipy"):
+    """Matcher search (prepared pattern spectra, overlap-save) with the given FFT backend."""
+    from .matcher import Matcher
+    matches = Matcher(pattern, sr, normalize=False, backend=backend).search(search)
+    return np.array([round(start * sr) for start, _, _, _ in matches])
+
+def method_matcher_low_memory(pattern, search, sr):
+    """Matcher search in chunks through fixed buffers, peaks picked as it goes."""
+    from .matcher import Matcher
+    matches = Matcher(pattern, sr, normalize=False, low_memory=True).search(search)
+    return np.array([round(start * sr) for start, _, _, _ in matches])
+
+def method_matcher_fftw(pattern, search, sr):
+    """Matcher search on pyFFTW plans (reported as an error when pyFFTW is not installed)."""
+    return method_matcher(pattern, search, sr, backend="fftw")
+
+def method_stretch(pattern, search, sr):
+    """Bank of 11 time-scaled variants (0.90 .. 1.10) in one batched correlation."""
+    from .stretch import stretch_search
+    return np.array([round(start * sr) for start, *_ in stretch_search(pattern, search, sr)])
+
+def method_pruned(pattern, search, sr):
+    """Matcher search restricted to the audible regions (silence pruning pre-pass)."""
+    from .matcher import Matcher
+    from .vad import pruned_search
+    matches, _ = pruned_search(Matcher(pattern, sr, normalize=False), search)
+    return np.array([round(start * sr) for start, _, _, _ in matches])
+
+METHODS = {
+    "fftconvolve": method_fftconvolve,
+    "fftconvolve-resampy-soundfile": method_fftconvolve_resampy,
+    "fftconvolve-plot-s2": method_fftconvolve_plot_s2,
+    "fftconvolve-improved": method_fftconvolve_improved,
+    "fftconvol-with-soundfile": method_ncc_cumsum,
+    "envelope": method_envelope,
+    "spectrogram": method_spectrogram,
+    "streaming": method_streaming,
+    "batch": method_batch,
+    "coarse": method_coarse,
+    "sharded": method_sharded,
+    "matcher": method_matcher,
+    "matcher-fftw": method_matcher_fftw,
+    "matcher-low-memory": method_matcher_low_memory,
+    "stretch": method_stretch,
+    "pruned": method_pruned,
+}
+
+# Offset grid of frame-based methods (samples); the match tolerance is at least half of it
+RESOLUTION = {"envelope": 256, "spectrogram": 512}
+POLL_SECONDS = 1.0  # how often the parent checks that a benchmark process is still alive
+
+# ---- Scoring and measurement ----
+
+def precision_recall(detected, truth, tolerance):
+    """One-to-one matching of detections to true offsets within tolerance samples."""
+    detected = sorted(int(d) for d in detected)
+    unmatched = sorted(int(t) for t in truth)
+    hits = 0
+    for d in detected:
+        best = min(unmatched, key=lambda t: abs(t - d), default=None)
+        if best is not None and abs(best - d) <= tolerance:
+            unmatched.remove(best)
+            hits += 1
+    precision = hits / len(detected) if detected else 0.0
+    recall = hits / len(truth) if len(truth) else 1.0
+    return precision, recall
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB elsewhere
+
+def _run_one(name, workload_args, tolerance_s, repeat, queue):
+    pattern, search, truth = make_workload(**workload_args)
+    sr = workload_args["sr"]
+    baseline_rss = _peak_rss_mb()
+    times = []
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            detected = METHODS[name](pattern, search, sr)
+            times.append(time.perf_counter() - t0)
+    except Exception as e:  # e.g. an optional dependency is missing
+        queue.put({"method": name, "error": f"{type(e).__name__}: {e}"})
+        return
+    wall = min(times)
+    peak_rss = _peak_rss_mb()
+    # ru_maxrss cannot be reset, so the method's own footprint is traced separately
+    tracemalloc.start()
+    METHODS[name](pattern, search, sr)
+    peak_alloc = tracemalloc.get_traced_memory()[1] / (1 << 20)
+    tracemalloc.stop()
+    tolerance = max(tolerance_s * sr, RESOLUTION.get(name, 0) / 2)
+    precision, recall = precision_recall(detected, truth, tolerance)
+    queue.put({
+        "method": name,
+        "wall_time_s": wall,
+        "throughput_x": (len(search) / sr) / wall if wall > 0 else None,
+        "peak_rss_mb": peak_rss,
+        "rss_delta_mb": None if peak_rss is None else peak_rss - baseline_rss,
+        "peak_alloc_mb": peak_alloc,
+        "peak_alloc_x_signal": peak_alloc * (1 << 20) / search.nbytes,
+        "precision": precision,
+        "recall": recall,
+        "n_detections": len(detected),
+    })
+
+def _wait_result(name, proc, queue, timeout=None):
+    """
+    The child's result, or an error entry if it dies without one (e.g. killed
+    for running out of memory) or runs longer than timeout seconds.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        try:
+            return queue.get(timeout=POLL_SECONDS)
+        except queue_module.Empty:
+            pass
+        if proc.exitcode is not None:
+            try:  # it may have put its result just before exiting
+                return queue.get(timeout=POLL_SECONDS)
+            except queue_module.Empty:
+                return {"method": name, "error": f"process exited with code {proc.exitcode} without a result"}
+        if deadline is not None and time.monotonic() > deadline:
+            proc.terminate()
+            return {"method": name, "error": f"timed out after {timeout:g}s"}
+
+def run_benchmark(methods=None, workload_args=None, tolerance_s=0.05, repeat=1, timeout=None):
+    """Run each method in its own process; returns the JSON-ready report."""
+    defaults = dict(seed=0, sr=4000, duration=600.0, pattern_seconds=2.0, copies=6, noise=0.05, silence=0.0)
+    workload_args = {**defaults, **(workload_args or {})}
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for name in methods or METHODS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_one, args=(name, workload_args, tolerance_s, repeat, queue))
+        proc.start()
+        results.append(_wait_result(name, proc, queue, timeout))
+        proc.join()
+        if "error" in results[-1]:
+            print(f"{name:32s} skipped: {results[-1]['error']}", flush=True)
+            continue
+        print(f"{name:32s} {results[-1]['wall_time_s']:8.3f}s  "
+              f"{results[-1]['peak_alloc_x_signal']:6.1f}x mem  "
+              f"P={results[-1]['precision']:.2f} R={results[-1]['recall']:.2f}", flush=True)
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "workload": workload_args,
+        "tolerance_s": tolerance_s,
+        "results": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio matching variants.")
+    parser.add_argument("--methods", nargs="*", choices=list(METHODS), help="subset to run (default: all)")
+    parser.add_argument("--duration", type=float, default=600.0, help="search length in seconds")
+    parser.add_argument("--sr", type=int, default=4000)
+    parser.add_argument("--pattern-seconds", type=float, default=2.0)
+    parser.add_argument("--copies", type=int, default=6)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--silence", type=float, default=0.0,
+                        help="fraction of the search made of silent pauses (for the pruned method)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="match tolerance in seconds")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per method, best time is kept")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="seconds after which a method's process is stopped (default: no limit)")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    workload_args = dict(seed=args.seed, sr=args.sr, duration=args.duration,
+                         pattern_seconds=args.pattern_seconds, copies=args.copies, noise=args.noise,
+                         silence=args.silence)
+    report = run_benchmark(args.methods, workload_args, args.tolerance, args.repeat, args.timeout)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=float)
+    print(f"Results written to '{args.out}'")
+
+if __name__ == "__main__":
+    main()
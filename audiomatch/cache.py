@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "audiomatch")
+DEFAULT_MAX_BYTES = 4 << 30  # 4 GiB of decoded audio
+DIGEST_INDEX = "digests.json"
+
+def file_digest(path, chunk_size=1 << 20):
+    """Content hash of a file (blake2b, hex)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+class AudioCache:
+    """
+    On-disk cache of decoded, resampled mono float32 audio.
+    Entries are .npy files keyed by (content hash, sample rate, resampler) and
+    are opened zero-copy with np.load(mmap_mode='r'). Hits refresh the file's
+    mtime, and the oldest entries are evicted once the cache exceeds max_bytes.
+    Content hashes are remembered per (path, size, mtime) so unchanged files are
+    not re-read just to be hashed.
+    """
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        self._index_path = os.path.join(self.root, DIGEST_INDEX)
+        self._lock = threading.Lock()  # decode pools share one cache
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                self._digests = json.load(f)
+        except (OSError, ValueError):
+            self._digests = {}
+
+    def digest(self, path):
+        """Content hash of path, reusing the remembered one while size and mtime are unchanged."""
+        st = os.stat(path)
+        abs_path = os.path.abspath(path)
+        known = self._digests.get(abs_path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[abs_path] = [st.st_size, st.st_mtime_ns, digest]
+            self._save_index()
+        return digest
+
+    def entry_path(self, path, sr, resampler):
+        return os.path.join(self.root, f"{self.digest(path)}_{int(sr)}_{resampler}.npy")
+
+    def peek(self, path, sr, resampler):
+        """The cached audio for path at sr (read-only, memory-mapped), or None on a miss; never decodes."""
+        entry = self.entry_path(path, sr, resampler)
+        if not os.path.exists(entry):
+            return None
+        os.utime(entry)
+        return np.load(entry, mmap_mode='r')
+
+    def load(self, path, sr, resampler, decode):
+        """
+        Decoded audio for path at sr. On a miss, decode() must return the samples
+        (any shape/dtype, averaged to mono float32 before storing).
+        Returns a read-only memory-mapped array.
+        """
+        cached = self.peek(path, sr, resampler)
+        if cached is not None:
+            return cached
+        entry = self.entry_path(path, sr, resampler)
+
+        data = np.asarray(decode())
+        if data.ndim > 1:
+            data = data.mean(axis=1)
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp_path, entry)  # atomic, so concurrent readers never see half a file
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self.evict(keep=entry)
+        return np.load(entry, mmap_mode='r')
+
+    def entries(self):
+        """(path, size, mtime) of every cached array, least recently used first."""
+        found = []
+        for name in os.listdir(self.root):
+            if name.endswith(".npy"):
+                full = os.path.join(self.root, name)
+                st = os.stat(full)
+                found.append((full, st.st_size, st.st_mtime))
+        return sorted(found, key=lambda e: e[2])
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for full, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if full == keep:
+                continue
+            try:
+                os.remove(full)
+            except OSError:  # still memory-mapped by a reader (Windows)
+                continue
+            total -= size
+
+    def clear(self):
+        for full, _, _ in self.entries():
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+
+    def _save_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._digests, f)
+        os.replace(tmp_path, self._index_path)
+
+_default_cache = None
+
+def default_cache():
+    """Process-wide cache in DEFAULT_CACHE_DIR (AUDIOMATCH_CACHE overrides the location)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AudioCache(os.environ.get("AUDIOMATCH_CACHE", DEFAULT_CACHE_DIR))
+    return _default_cache
@@ -0,0 +1,106 @@
+import numpy as np
+from scipy.signal import find_peaks
+
+from .envelope import energy_envelope
+from .ncc import normalized_cross_correlation
+
+# (hop, minimum candidates kept) per coarse level, coarsest first. Each level scores
+# the RMS envelope (window = 2 x hop) and hands its best offsets to the next one:
+# every offset scoring at least height - COARSE_MARGIN, and no fewer than the minimum.
+DEFAULT_LEVELS = ((64, 32), (8, 16))
+# Windows whose full-rate NCC reaches the height score well above it on the envelope
+# (>= height + 0.15 on the bench workloads, noisy ones included), so this margin keeps
+# every one of them however many there are.
+COARSE_MARGIN = 0.2
+
+def _merge_ranges(ranges):
+    """Union of [lo, hi) ranges, sorted."""
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+def _best_offsets(scores_by_range, keep, distance, threshold):
+    """Local maxima (sample offset, score) over all ranges scoring at least threshold, or the top `keep` if more."""
+    found = []
+    for offset0, step, scores in scores_by_range:
+        peaks, _ = find_peaks(scores, distance=max(1, distance))
+        found += [(offset0 + int(p) * step, float(scores[p])) for p in peaks]
+        if len(scores) and scores.argmax() not in peaks:
+            # a maximum at a range edge is still a candidate for the next level
+            found.append((offset0 + int(scores.argmax()) * step, float(scores.max())))
+    found.sort(key=lambda c: c[1], reverse=True)
+    return [c for i, c in enumerate(found) if i < keep or c[1] >= threshold]
+
+def coarse_to_fine_search(pattern, search, sr, levels=DEFAULT_LEVELS, height=0.7, distance_factor=0.25,
+                          coarse_margin=COARSE_MARGIN):
+    """
+    Hierarchical NCC search. The coarsest level scores the whole source on its
+    energy envelope; every further level (and finally the full-rate NCC) only
+    scores small ranges around the candidates kept by the previous level, i.e.
+    those scoring at least height - coarse_margin (so the number of matches is
+    not capped by the level's minimum).
+    Returns (matches, stats): matches are (start_time, end_time, similarity, rms)
+    as in the full search, stats reports how much of the source was scored at full rate.
+    """
+    pattern = np.asarray(pattern, dtype=np.float32)
+    search = np.asarray(search, dtype=np.float32)
+    m, n = len(pattern), len(search)
+    n_offsets = n - m + 1
+    if m == 0 or n_offsets <= 0:
+        return [], {"full_rate_offsets": 0, "full_rate_fraction": 0.0}
+    distance = max(1, distance_factor * m)
+
+    candidates = None  # None: whole source
+    uncertainty = 0
+    for hop, keep in levels:
+        win = 2 * hop
+        pat_env = energy_envelope(pattern, win, hop)
+        if len(pat_env) < 2:
+            continue  # pattern too short for this level
+        if candidates is None:
+            ranges = [[0, n_offsets]]
+        else:
+            ranges = _merge_ranges([[max(0, c - uncertainty), min(n_offsets, c + uncertainty + 1)]
+                                    for c, _ in candidates])
+        scored = []
+        for lo, hi in ranges:
+            first = lo // hop
+            last = -(-hi // hop)
+            seg = search[first * hop : last * hop + m + win]
+            env = energy_envelope(seg, win, hop)
+            if len(env) >= len(pat_env):
+                scored.append((first * hop, hop, normalized_cross_correlation(env, pat_env)))
+        candidates = _best_offsets(scored, keep, distance / hop, height - coarse_margin)
+        uncertainty = 2 * hop
+
+    if candidates is None:
+        ranges = [[0, n_offsets]]
+    else:
+        # Pad by `distance` so find_peaks sees the same neighbourhood as in the full search
+        pad = uncertainty + int(np.ceil(distance))
+        ranges = _merge_ranges([[max(0, c - pad), min(n_offsets, c + pad + 1)] for c, _ in candidates])
+
+    found = []
+    for lo, hi in ranges:
+        ncc = normalized_cross_correlation(search[lo : hi + m - 1], pattern)
+        peaks, _ = find_peaks(ncc, height=height, distance=distance)
+        found += [(lo + int(p), float(ncc[p])) for p in peaks]
+
+    # Ranges are disjoint but may sit closer than `distance`: same greedy rule as find_peaks
+    kept = []
+    for pos, score in sorted(found, key=lambda c: c[1], reverse=True):
+        if all(abs(pos - k) >= np.ceil(distance) for k, _ in kept):
+            kept.append((pos, score))
+    kept.sort()
+
+    matches = []
+    for pos, score in kept:
+        segment = search[pos : pos + m]
+        rms = float(np.sqrt(np.mean(segment.astype(np.float64) ** 2)))
+        matches.append((pos / sr, (pos + m) / sr, score, rms))
+    scored_offsets = sum(hi - lo for lo, hi in ranges)
+    return matches, {"full_rate_offsets": scored_offsets, "full_rate_fraction": scored_offsets / n_offsets}
@@ -0,0 +1,93 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+MIN_CAPACITY = 1 << 16  # samples allocated before the first read when the duration is unknown
+
+def ffmpeg_command(path, sr, start=0, count=None):
+    """ffmpeg decoding path to mono f32le at sr on stdout; start/count (samples at sr) select a window."""
+    window = []
+    if start:
+        window += ["-ss", f"{start / sr:.6f}"]  # input option: seeks instead of decoding up to start
+    if count is not None:
+        window += ["-t", f"{count / sr:.6f}"]
+    return ["ffmpeg"] + window + ["-i", path, "-f", "f32le", "-ac", "1", "-ar", str(sr), "-v", "0", "pipe:1"]
+
+def read_into(stream, view):
+    """Fill the byte view from stream with readinto; returns the number of bytes read (short only at EOF)."""
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+def probe_duration(path):
+    """Duration in seconds from ffprobe, or None if it cannot be determined."""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path]
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        return float(out.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+def ffmpeg_decode(path, sr, expected_samples=None, start=0, count=None):
+    """
+    Decode path to mono float32 at sr, reading ffmpeg's f32le output straight
+    into a NumPy buffer (no intermediate bytes object). The buffer is sized from
+    ffprobe's duration when available and doubled if the estimate falls short.
+    start/count decode only samples [start, start + count) (fewer at the end of the file).
+    """
+    if count is not None:
+        expected_samples = count + 1  # one spare sample, so a full window never triggers a regrow
+    elif expected_samples is None:
+        duration = probe_duration(path)
+        expected_samples = int(duration * sr * 1.01) + sr if duration else MIN_CAPACITY
+    buf = np.empty(max(expected_samples, 1), dtype=np.float32)
+    n_bytes = 0
+    with subprocess.Popen(ffmpeg_command(path, sr, start, count), stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL) as proc:
+        while True:
+            view = memoryview(buf).cast('B')
+            got = read_into(proc.stdout, view[n_bytes:])
+            n_bytes += got
+            if n_bytes < len(view):
+                break
+            grown = np.empty(2 * len(buf), dtype=np.float32)
+            grown[: len(buf)] = buf
+            buf = grown
+    if proc.returncode and n_bytes == 0:
+        raise RuntimeError(f"ffmpeg could not decode {path} (exit status {proc.returncode})")
+    n = n_bytes // 4 if count is None else min(n_bytes // 4, count)
+    return buf[:n]
+
+def decode_cached(path, sr, cache=None):
+    """ffmpeg_decode through an AudioCache when one is given (memory-mapped on a hit)."""
+    if cache is None:
+        return ffmpeg_decode(path, sr)
+    return cache.load(path, sr, "ffmpeg", lambda: ffmpeg_decode(path, sr))
+
+def decode_window(path, sr, start, count, cache=None):
+    """
+    Samples [start, start + count) of path at sr without decoding the whole file:
+    sliced from the memory-mapped cache entry when path is already cached, otherwise
+    decoded by ffmpeg seeking to start. Shorter at the end of the file.
+    """
+    cached = cache.peek(path, sr, "ffmpeg") if cache is not None else None
+    if cached is not None:
+        return np.array(cached[start : start + count])
+    return ffmpeg_decode(path, sr, start=start, count=count)
+
+def decode_many(paths, sr, max_workers=None, cache=None):
+    """
+    Decode several files at once with a bounded pool of ffmpeg processes.
+    Returns the arrays in the order of paths. With a cache (AudioCache),
+    already-decoded files are memory-mapped instead of decoded again.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+
+    # Each worker thread only waits on its ffmpeg pipe, so threads are enough
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda path: decode_cached(path, sr, cache), paths))
@@ -0,0 +1,11 @@
+import numpy as np
+
+def energy_envelope(audio, win=512, hop=256):
+    """RMS of audio[i:i+win] for i in range(0, len(audio)-win, hop), computed from one cumsum."""
+    audio = np.asarray(audio)
+    starts = np.arange(0, len(audio) - win, hop)
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.float32)
+    csum_sq = np.concatenate(([0.0], np.cumsum(np.square(audio, dtype=np.float64))))
+    energy = np.maximum(csum_sq[starts + win] - csum_sq[starts], 0.0) / win
+    return np.sqrt(energy).astype(np.float32)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from .stats import BlockedPrefixSums
+
+TAIL_FRACTION = 0.2  # tail RMS covers the last 20% of the match, as in the resampy/plot-s2 scripts
+
+def peak_amplitudes(x, lo, hi):
+    """max |x[lo:hi]| for each non-empty range: two reduceat passes, and suffix maxima for ranges ending at len(x)."""
+    x = np.asarray(x)
+    lo = np.asarray(lo, dtype=np.int64)
+    hi = np.minimum(np.asarray(hi, dtype=np.int64), len(x))
+    peaks = np.empty(len(lo), dtype=x.dtype)
+    # reduceat cannot take len(x) as an index, so ranges running to the end of x are done apart
+    at_end = hi == len(x)
+    inner = ~at_end
+    if inner.any():
+        # Interleaved [lo0, hi0, lo1, hi1, ...]: even reduceat rows are the ranges, odd rows are discarded
+        bounds = np.column_stack((lo[inner], hi[inner])).ravel()
+        highs = np.maximum.reduceat(x, bounds)[::2]
+        lows = np.minimum.reduceat(x, bounds)[::2]
+        peaks[inner] = np.maximum(highs, -lows)
+    if at_end.any():
+        # Suffix maxima of |x| from the first such range serve all of them
+        first = int(lo[at_end].min())
+        suffix_peaks = np.maximum.accumulate(np.abs(x[first:])[::-1])[::-1]
+        peaks[at_end] = suffix_peaks[lo[at_end] - first]
+    return peaks
+
+def match_features(search, starts, m, prefix=None, tail_fraction=TAIL_FRACTION, context=None):
+    """
+    Features of the matches search[s:s+m] for every s in starts, all at once:
+        rms       RMS of the match
+        tail_rms  RMS of its last tail_fraction (at least one sample)
+        peak      max absolute amplitude
+        snr_db    match power over the power of the `context` samples (default m)
+                  on both sides, in dB
+    Energies come from block-anchored prefix sums: pass the BlockedPrefixSums (or
+    SearchSignal) already built for the NCC to reuse them, otherwise one is built.
+    Returns a dict of arrays in the order of starts.
+    """
+    search = np.asarray(search)
+    n = len(search)
+    starts = np.asarray(starts, dtype=np.int64)
+    if prefix is None:
+        prefix = BlockedPrefixSums(search)
+    context = m if context is None else context
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order]
+
+    ends = np.minimum(starts + m, n)
+    tail_lo = np.minimum(np.maximum(0, ends - int(tail_fraction * m)), ends - 1)
+    before_lo = np.maximum(0, starts - context)
+    after_hi = np.minimum(n, ends + context)
+    # One vectorized prefix-sum lookup for every range of every match
+    _, energy = prefix.range_sums(np.concatenate((starts, tail_lo, before_lo, ends)),
+                                  np.concatenate((ends, ends, starts, after_hi)))
+    match_sq, tail_sq, before_sq, after_sq = np.split(energy, 4)
+
+    length = np.maximum(ends - starts, 1)
+    noise_length = (starts - before_lo) + (after_hi - ends)
+    power = match_sq / length
+    with np.errstate(divide='ignore', invalid='ignore'):
+        noise = np.where(noise_length > 0, (before_sq + after_sq) / noise_length, np.nan)
+        snr_db = 10 * np.log10((power + 1e-12) / (noise + 1e-12))
+
+    features = {
+        "rms": np.sqrt(power),
+        "tail_rms": np.sqrt(tail_sq / (ends - tail_lo)),
+        "peak": peak_amplitudes(search, starts, ends),
+        "snr_db": snr_db,
+    }
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(len(order))
+    return {name: values[inverse] for name, values in features.items()}
@@ -0,0 +1,132 @@
+import os
+import pickle
+import threading
+import numpy as np
+from scipy import fft as sp_fft
+
+try:
+    import pyfftw
+except ImportError:  # scipy.fft is used instead
+    pyfftw = None
+
+DEFAULT_WISDOM = os.path.join(os.path.expanduser("~"), ".cache", "audiomatch", "fftw_wisdom.pickle")
+
+# ---- Real-input FFT backends ----
+# Both expose next_fast_len(n), rfft(x, n) and irfft(X, n) with scipy.fft's
+# zero-padding semantics, so Matcher (and anything else holding per-size
+# pattern spectra) can switch between them.
+
+class ScipyBackend:
+    """scipy.fft (pocketfft) real transforms on `workers` threads (-1: all cores)."""
+    name = "scipy"
+
+    def __init__(self, workers=-1):
+        self.workers = workers
+
+    def next_fast_len(self, n):
+        return sp_fft.next_fast_len(n, real=True)
+
+    def rfft(self, x, n):
+        return sp_fft.rfft(x, n, workers=self.workers)
+
+    def irfft(self, spectrum, n):
+        return sp_fft.irfft(spectrum, n, workers=self.workers)
+
+class FFTWBackend:
+    """
+    pyFFTW plans, built once per (size, dtype) and reused for every later call.
+    Planning results (FFTW wisdom) are saved to wisdom_path and loaded on start,
+    so FFTW_MEASURE planning is paid once per machine rather than once per process.
+    """
+    name = "fftw"
+
+    def __init__(self, threads=None, effort="FFTW_MEASURE", wisdom_path=DEFAULT_WISDOM):
+        if pyfftw is None:
+            raise ImportError("pyFFTW is not installed (pip install pyfftw).")
+        self.threads = threads or os.cpu_count() or 1
+        self.effort = effort
+        self.wisdom_path = wisdom_path
+        self._plans = {}
+        self._lock = threading.Lock()  # a plan owns its input/output buffers
+        if wisdom_path and os.path.exists(wisdom_path):
+            try:
+                with open(wisdom_path, "rb") as f:
+                    pyfftw.import_wisdom(pickle.load(f))
+            except (OSError, ValueError, pickle.UnpicklingError):
+                pass
+
+    def __getstate__(self):
+        # Plans hold FFTW buffers and cannot be pickled; worker processes rebuild them
+        state = self.__dict__.copy()
+        state["_plans"] = {}
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def next_fast_len(self, n):
+        return sp_fft.next_fast_len(n, real=True)
+
+    def _plan(self, kind, n, dtype):
+        key = (kind, n, dtype)
+        plan = self._plans.get(key)
+        if plan is None:
+            if kind == "rfft":
+                buf = pyfftw.empty_aligned(n, dtype=dtype)
+                plan = pyfftw.builders.rfft(buf, n, threads=self.threads, planner_effort=self.effort)
+            else:
+                buf = pyfftw.empty_aligned(n // 2 + 1, dtype=dtype)
+                plan = pyfftw.builders.irfft(buf, n, threads=self.threads, planner_effort=self.effort)
+            self._plans[key] = plan
+            self._save_wisdom()
+        return plan
+
+    def rfft(self, x, n):
+        x = np.asarray(x)
+        dtype = np.float32 if x.dtype == np.float32 else np.float64
+        with self._lock:
+            plan = self._plan("rfft", n, dtype)
+            buf = plan.input_array
+            count = min(len(x), n)
+            buf[:count] = x[:count]
+            buf[count:] = 0
+            return plan().copy()
+
+    def irfft(self, spectrum, n):
+        spectrum = np.asarray(spectrum)
+        dtype = np.complex64 if spectrum.dtype == np.complex64 else np.complex128
+        with self._lock:
+            plan = self._plan("irfft", n, dtype)
+            plan.input_array[:] = spectrum
+            return plan().copy()
+
+    def _save_wisdom(self):
+        if not self.wisdom_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.wisdom_path), exist_ok=True)
+            tmp_path = self.wisdom_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                pickle.dump(pyfftw.export_wisdom(), f)
+            os.replace(tmp_path, self.wisdom_path)
+        except OSError:
+            pass
+
+BACKENDS = {"scipy": ScipyBackend, "fftw": FFTWBackend}
+
+def get_backend(backend=None):
+    """
+    A backend instance from a name ("scipy", "fftw", "auto": FFTW when installed)
+    or an existing instance; None means scipy.
+    """
+    if backend is None:
+        return ScipyBackend()
+    if not isinstance(backend, str):
+        return backend
+    if backend == "auto":
+        return FFTWBackend() if pyfftw is not None else ScipyBackend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown FFT backend '{backend}' (choose from {', '.join(BACKENDS)} or auto).")
+    return BACKENDS[backend]()
@@ -0,0 +1,249 @@
+"""
+Spectrogram peak-pair fingerprints for looking up a pattern in many sources.
+
+    python -m audiomatch.fingerprint build INDEX_DIR source1.mp3 source2.mp3 ...
+    python -m audiomatch.fingerprint query INDEX_DIR pattern.mp3
+
+Each source is reduced to hashes of pairs of spectrogram peaks (same
+scipy.signal.spectrogram settings as spectrogram_original.py). A query hashes
+the pattern, looks every hash up in the sorted index (searchsorted), votes for
+(source, frame offset) and confirms only the best-voted offsets with the NCC,
+so its cost follows the pattern length rather than the size of the library.
+"""
+import argparse
+import json
+import os
+import numpy as np
+from scipy.ndimage import maximum_filter
+from scipy.signal import spectrogram
+
+from .decode import decode_cached, decode_window
+from .matcher import Matcher
+
+NPERSEG = 1024
+NOVERLAP = 512
+HOP = NPERSEG - NOVERLAP
+PEAK_NEIGHBORHOOD = (21, 7)  # (frequency bins, frames) a peak must dominate
+PEAKS_PER_FRAME = 5           # average peak density kept
+FAN_OUT = 10                  # partners paired with each anchor peak
+MAX_DT = 63                   # frames; dt is stored in 6 bits
+MIN_VOTES = 4                 # hash hits needed before an offset is checked with the NCC
+INDEX_ARRAYS = "fingerprints.npz"
+INDEX_META = "index.json"
+
+# ---- Fingerprints ----
+
+def spectrogram_peaks(y, sr):
+    """(frame, bin) of spectral peaks of y, sorted by frame then bin."""
+    y = np.asarray(y, dtype=np.float32)
+    if len(y) <= NPERSEG:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    S = np.log10(spectrogram(y, fs=sr, nperseg=NPERSEG, noverlap=NOVERLAP)[2] + 1e-10)
+    is_peak = (S == maximum_filter(S, size=PEAK_NEIGHBORHOOD, mode='constant', cval=-np.inf))
+    is_peak &= S > np.median(S)  # drop maxima of the noise floor
+    bins, frames = np.nonzero(is_peak)
+    budget = PEAKS_PER_FRAME * S.shape[1]
+    if len(frames) > budget:
+        strongest = np.argpartition(S[bins, frames], len(frames) - budget)[len(frames) - budget:]
+        bins, frames = bins[strongest], frames[strongest]
+    order = np.lexsort((bins, frames))
+    return frames[order], bins[order]
+
+def peak_pair_hashes(frames, bins):
+    """
+    (hash, anchor frame) for each anchor peak paired with its next FAN_OUT peaks
+    at 1..MAX_DT frames: hash = f1 << 16 | f2 << 6 | dt (NPERSEG // 2 + 1 bins fit in 10 bits).
+    """
+    hashes, anchors = [], []
+    for j in range(1, FAN_OUT + 1):
+        dt = frames[j:] - frames[:-j]
+        ok = (dt >= 1) & (dt <= MAX_DT)
+        f1, f2 = bins[:-j][ok], bins[j:][ok]
+        hashes.append((f1 << 16) | (f2 << 6) | dt[ok])
+        anchors.append(frames[:-j][ok])
+    if not hashes:
+        return np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint32)
+    return np.concatenate(hashes).astype(np.uint32), np.concatenate(anchors).astype(np.uint32)
+
+def fingerprint(y, sr):
+    """(hashes, anchor frames) of a signal."""
+    return peak_pair_hashes(*spectrogram_peaks(y, sr))
+
+# ---- Index ----
+
+class FingerprintIndex:
+    """
+    Sorted hash table of many sources: parallel arrays (hash, source, frame)
+    sorted by hash, plus per-source metadata. Stored on disk as an .npz of the
+    arrays and a JSON description of the sources.
+    """
+    def __init__(self, sr):
+        self.sr = sr
+        self.sources = []  # dicts: name, path, n_samples
+        self._parts = []
+        self._hashes = np.zeros(0, dtype=np.uint32)
+        self._source_ids = np.zeros(0, dtype=np.uint32)
+        self._frames = np.zeros(0, dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.sources)
+
+    def add(self, name, samples, path=None):
+        """Fingerprint one source; path (if any) is used to reload it for confirmation."""
+        hashes, frames = fingerprint(samples, self.sr)
+        source_id = len(self.sources)
+        self.sources.append({"name": name, "path": path, "n_samples": int(len(samples))})
+        self._parts.append((hashes, np.full(len(hashes), source_id, dtype=np.uint32), frames))
+        return source_id
+
+    def add_file(self, path, cache=None):
+        return self.add(os.path.basename(path), decode_cached(path, self.sr, cache), path=os.path.abspath(path))
+
+    def _finalize(self):
+        """Merge newly added sources into the hash-sorted arrays."""
+        if not self._parts:
+            return
+        hashes, ids, frames = (np.concatenate([current] + [part[k] for part in self._parts])
+                               for k, current in enumerate((self._hashes, self._source_ids, self._frames)))
+        order = np.argsort(hashes, kind='stable')
+        self._hashes, self._source_ids, self._frames = hashes[order], ids[order], frames[order]
+        self._parts = []
+
+    def save(self, directory):
+        self._finalize()
+        os.makedirs(directory, exist_ok=True)
+        np.savez(os.path.join(directory, INDEX_ARRAYS),
+                 hashes=self._hashes, source_ids=self._source_ids, frames=self._frames)
+        meta = {"sr": self.sr, "nperseg": NPERSEG, "noverlap": NOVERLAP, "sources": self.sources}
+        with open(os.path.join(directory, INDEX_META), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, INDEX_META), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta["nperseg"], meta["noverlap"]) != (NPERSEG, NOVERLAP):
+            raise ValueError("Index was built with different spectrogram settings.")
+        index = cls(meta["sr"])
+        index.sources = meta["sources"]
+        with np.load(os.path.join(directory, INDEX_ARRAYS)) as arrays:
+            index._hashes = arrays["hashes"]
+            index._source_ids = arrays["source_ids"]
+            index._frames = arrays["frames"]
+        return index
+
+    def candidates(self, pattern, top=10, min_votes=MIN_VOTES):
+        """
+        Best-voted (source_id, frame_offset, votes) for pattern, most votes first.
+        Offsets within one frame of a better one (same source) are folded into it.
+        """
+        self._finalize()
+        q_hashes, q_frames = fingerprint(pattern, self.sr)
+        if len(q_hashes) == 0 or len(self._hashes) == 0:
+            return []
+        lo = np.searchsorted(self._hashes, q_hashes, side='left')
+        hi = np.searchsorted(self._hashes, q_hashes, side='right')
+        counts = hi - lo
+        if counts.sum() == 0:
+            return []
+        # Expand every query hash into its postings without a Python loop
+        posting = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        offsets = self._frames[posting].astype(np.int64) - np.repeat(q_frames, counts).astype(np.int64)
+        sources = self._source_ids[posting].astype(np.int64)
+        keep = offsets >= -1  # the pattern cannot start before the source (one frame of slack)
+        keys, votes = np.unique(sources[keep] << 32 | (offsets[keep] + 1), return_counts=True)
+
+        found = []
+        for i in np.argsort(-votes, kind='stable'):
+            if votes[i] < min_votes or len(found) >= top:
+                break
+            source_id, offset = int(keys[i] >> 32), int(keys[i] & 0xFFFFFFFF) - 1
+            if any(s == source_id and abs(o - offset) <= 1 for s, o, _ in found):
+                continue
+            found.append((source_id, offset, int(votes[i])))
+        return found
+
+    def search(self, pattern, top=10, min_votes=MIN_VOTES, height=0.7, load=None, cache=None):
+        """
+        Matches of pattern across the indexed sources:
+        [(source name, start_time, end_time, similarity, rms), ...], best first.
+        Each voted offset is confirmed by the NCC over a few frames around it.
+        Only those windows are read: load(source_id), if given, supplies a source's
+        samples (called at most once per source and query); otherwise the windows
+        are sliced from the cache's memory-mapped entry or decoded by seeking ffmpeg,
+        so the cost does not grow with the length of the sources.
+        """
+        matcher = Matcher(pattern, self.sr, height=height, normalize=False)
+        m = matcher.m
+        pad = 2 * HOP
+        by_source = {}
+        for source_id, offset, _ in self.candidates(pattern, top, min_votes):
+            by_source.setdefault(source_id, []).append((max(0, offset * HOP - pad), offset * HOP + m + pad))
+
+        matches = []
+        for source_id, windows in by_source.items():
+            source = self.sources[source_id]
+            samples = load(source_id) if load else None
+            # Overlapping windows of one source are read once, as one span
+            spans = []
+            for lo, hi in sorted(windows):
+                if spans and lo <= spans[-1][1]:
+                    spans[-1][1] = max(spans[-1][1], hi)
+                else:
+                    spans.append([lo, hi])
+            read = {lo: np.asarray(samples[lo:hi] if samples is not None
+                                   else decode_window(source["path"], self.sr, lo, hi - lo, cache), dtype=np.float32)
+                    for lo, hi in spans}
+            for lo, hi in windows:
+                span_lo = max(s_lo for s_lo in read if s_lo <= lo)
+                ncc, sums_sq = matcher.ncc(read[span_lo][lo - span_lo : hi - span_lo])
+                if len(ncc) == 0:
+                    continue
+                best = int(np.argmax(ncc))
+                if ncc[best] >= height:
+                    start = lo + best
+                    matches.append((source["name"], start / self.sr, (start + m) / self.sr,
+                                    float(ncc[best]), float(np.sqrt(sums_sq[best] / m))))
+        matches.sort(key=lambda match: match[3], reverse=True)
+        return matches
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m audiomatch.fingerprint",
+                                     description="Build or query a fingerprint index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="fingerprint sources into an index directory")
+    build.add_argument("index")
+    build.add_argument("files", nargs="+")
+    build.add_argument("--sr", type=int, default=8000)
+    query = sub.add_parser("query", help="look a pattern up in an index")
+    query.add_argument("index")
+    query.add_argument("pattern")
+    query.add_argument("--top", type=int, default=10, help="voted offsets confirmed with the NCC")
+    query.add_argument("--height", type=float, default=0.7)
+    args = parser.parse_args(argv)
+
+    from .cache import default_cache
+    cache = default_cache()
+    if args.command == "build":
+        if os.path.exists(os.path.join(args.index, INDEX_META)):
+            index = FingerprintIndex.load(args.index)
+            if index.sr != args.sr:
+                parser.error(f"index uses sr={index.sr}")
+        else:
+            index = FingerprintIndex(args.sr)
+        for path in args.files:
+            index.add_file(path, cache)
+            print(f"Indexed {path}")
+        index.save(args.index)
+        print(f"{len(index)} source(s) in '{args.index}'")
+        return
+    index = FingerprintIndex.load(args.index)
+    pattern = decode_cached(args.pattern, index.sr, cache)
+    matches = index.search(pattern, top=args.top, height=args.height, cache=cache)
+    for i, (name, start, end, sim, rms_val) in enumerate(matches):
+        print(f"Match {i+1}: {name} Start = {start:.2f}s, End = {end:.2f}s, Sim = {sim:.2f}, RMS = {rms_val:.4f}")
+    if not matches:
+        print("No matches found.")
+
+if __name__ == "__main__":
+    main()
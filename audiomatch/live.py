@@ -0,0 +1,145 @@
+"""
+Live pattern detection on an audio stream that is still being produced:
+
+    ffmpeg -i INPUT -f f32le -ac 1 -ar 4000 - | python -m audiomatch.live PATTERN --sr 4000
+
+Frames of any size go in; a candidate event comes out as soon as the window
+that scores it is complete, i.e. at most one correlation block + the pattern
+length after the match starts. It is confirmed once no later peak within the
+peak distance can replace it, or withdrawn if one does.
+"""
+import argparse
+import sys
+import time
+from collections import namedtuple
+import numpy as np
+from scipy import fft as sp_fft
+
+from .decode import decode_cached, read_into
+from .stream import StreamingNCC, StreamingPeakPicker
+
+CANDIDATE, CONFIRMED, WITHDRAWN = "candidate", "confirmed", "withdrawn"
+
+MatchEvent = namedtuple("MatchEvent", "start end similarity rms detected_at wall_time status")
+MatchEvent.__doc__ = """\
+One detection. start/end/detected_at are stream times in seconds
+(detected_at = how much audio had been received when the event was emitted);
+wall_time is time.time() at detection. status is CANDIDATE (best peak so far,
+may still be replaced), CONFIRMED (final, as find_peaks would report it) or
+WITHDRAWN (an earlier candidate replaced by a higher peak within the distance)."""
+
+class LiveDetector:
+    """
+    Incremental NCC detector for one stream (fftconvol-with-soundfile.py math).
+    Incoming frames are copied into one preallocated overlap-save buffer of FFT
+    size; when it is full it is scored with one FFT pair and its last M-1 samples
+    are moved to its front, so nothing is reallocated however long the stream is
+    or however small the frames are.
+
+    A peak is reported as a CANDIDATE as soon as it is scored, at most
+    block_size + M samples after it starts: a smaller block_size (default about
+    3 M) lowers that at the cost of more FFTs. CONFIRMED and WITHDRAWN events
+    follow once the peak distance has passed, so the confirmed events are exactly
+    the batch matches.
+    """
+    def __init__(self, pattern, sr, height=0.7, distance_factor=0.25, block_size=None):
+        self.sr = sr
+        m = len(pattern)
+        fft_size = sp_fft.next_fast_len(block_size + m - 1, real=True) if block_size else None
+        self._ncc = StreamingNCC(pattern, fft_size=fft_size)
+        self.m = self._ncc.m
+        self.block_size = self._ncc.step
+        self._picker = StreamingPeakPicker(height, max(1, distance_factor * self.m))
+        self._buffer = np.empty(self._ncc.nfft, dtype=np.float32)
+        self._filled = 0
+        self._position = 0  # absolute index of the first window in _buffer
+        self._candidates = {}  # index -> candidate event not yet confirmed or withdrawn
+        self.received = 0  # samples received so far
+
+    def push(self, frame):
+        """Feed a frame of float32 samples; returns the MatchEvents it produced."""
+        frame = np.asarray(frame, dtype=np.float32).ravel()
+        events = []
+        while len(frame):
+            take = min(len(frame), len(self._buffer) - self._filled)
+            self._buffer[self._filled : self._filled + take] = frame[:take]
+            self._filled += take
+            self.received += take
+            frame = frame[take:]
+            if self._filled == len(self._buffer):
+                events += self._process(self._buffer)
+                # Carry the last M-1 samples: the windows that start in them are not complete yet
+                carried = len(self._buffer) - self.m + 1
+                self._buffer[: self.m - 1] = self._buffer[carried:]
+                self._filled = self.m - 1
+        return events
+
+    def flush(self):
+        """End of stream: score the partial buffer and settle every held peak."""
+        events = self._process(self._buffer[: self._filled]) if self._filled >= self.m else []
+        self._filled = 0
+        return events + self._update(self._picker.flush(), final=True)
+
+    def _process(self, samples):
+        ncc, sums_sq = self._ncc.score(samples)
+        start_index = self._position
+        self._position += len(ncc)
+        return self._update(self._picker.push(start_index, ncc, sums_sq))
+
+    def _update(self, settled, final=False):
+        """Events for the peaks just settled and for changes of the held cluster's best peaks."""
+        now, detected_at = time.time(), self.received / self.sr
+
+        def event(peak, status):
+            idx, sim, sum_sq = peak
+            return MatchEvent(idx / self.sr, (idx + self.m) / self.sr, sim, float(np.sqrt(sum_sq / self.m)),
+                              detected_at, now, status)
+
+        events = []
+        for peak in settled:
+            self._candidates.pop(peak[0], None)
+            events.append(event(peak, CONFIRMED))
+        held = {} if final else {peak[0]: peak for peak in self._picker.peek()}
+        for idx in sorted(self._candidates.keys() - held.keys()):
+            events.append(self._candidates.pop(idx)._replace(detected_at=detected_at, wall_time=now,
+                                                             status=WITHDRAWN))
+        for idx in sorted(held.keys() - self._candidates.keys()):
+            self._candidates[idx] = event(held[idx], CANDIDATE)
+            events.append(self._candidates[idx])
+        return events
+
+def iter_pipe_frames(stream, frame_size=1024):
+    """float32 frames read from a binary stream of raw f32le samples (e.g. sys.stdin.buffer)."""
+    while True:
+        frame = np.empty(frame_size, dtype=np.float32)
+        view = memoryview(frame).cast('B')
+        filled = read_into(stream, view)
+        if filled >= 4:
+            yield frame[: filled // 4]
+        if filled < len(view):
+            break
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m audiomatch.live",
+                                     description="Detect a pattern in raw f32le mono audio on stdin.")
+    parser.add_argument("pattern", help="pattern audio file")
+    parser.add_argument("--sr", type=int, default=4000, help="sample rate of the stdin stream")
+    parser.add_argument("--height", type=float, default=0.7)
+    parser.add_argument("--frame", type=int, default=1024, help="samples read per frame")
+    parser.add_argument("--block", type=int, default=None,
+                        help="samples per correlation block (smaller: lower latency, more FFTs)")
+    args = parser.parse_args(argv)
+
+    detector = LiveDetector(decode_cached(args.pattern, args.sr), args.sr, height=args.height,
+                            block_size=args.block)
+    labels = {CANDIDATE: "Candidate", CONFIRMED: "Match", WITHDRAWN: "Withdrawn"}
+    for frame in iter_pipe_frames(sys.stdin.buffer, args.frame):
+        for event in detector.push(frame):
+            print(f"{labels[event.status]}: Start = {event.start:.2f}s, End = {event.end:.2f}s, "
+                  f"Sim = {event.similarity:.2f}, RMS = {event.rms:.4f} (at {event.detected_at:.2f}s)", flush=True)
+    for event in detector.flush():
+        print(f"{labels[event.status]}: Start = {event.start:.2f}s, End = {event.end:.2f}s, "
+              f"Sim = {event.similarity:.2f}, RMS = {event.rms:.4f} (end of stream)", flush=True)
+
+if __name__ == "__main__":
+    main()
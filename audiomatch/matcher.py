@@ -0,0 +1,156 @@
+import numpy as np
+from scipy.signal import find_peaks
+
+from .decode import decode_cached
+from .fft import get_backend
+from .ncc import normalize_correlation
+from .stats import ANCHOR_BLOCK, BlockedPrefixSums
+from .stream import StreamingPeakPicker
+
+BLOCK_FACTOR = 4  # overlap-save FFT length is about BLOCK_FACTOR x the pattern length
+
+def peak_normalize(x):
+    """x / max|x| (librosa.util.normalize with its defaults); silent input is returned unchanged."""
+    x = np.asarray(x, dtype=np.float32)
+    peak = np.max(np.abs(x)) if len(x) else 0.0
+    return x / peak if peak > 0 else x
+
+class Matcher:
+    """
+    A pattern prepared once for searching many signals, as fftconvol-with-soundfile.py
+    does for one. Holds the centered pattern, its energy and its reversed spectrum
+    per FFT size, so a long-running worker pays the preparation only once per pattern.
+    backend selects the FFT implementation: "scipy" (default), "fftw", "auto" or an instance.
+    low_memory makes search() score the signal in chunks of about ANCHOR_BLOCK offsets
+    through a fixed set of buffers and pick peaks as it goes, so beyond the signal
+    itself memory stays bounded by the chunk size (same matches, bit-identical scores).
+    """
+    def __init__(self, pattern, sr, height=0.7, distance_factor=0.25, normalize=True, fft_sizes=(),
+                 backend=None, low_memory=False):
+        self.sr = sr
+        self.backend = get_backend(backend)
+        self.low_memory = low_memory
+        self.height = height
+        self.normalize = normalize
+        pattern = peak_normalize(pattern) if normalize else np.asarray(pattern, dtype=np.float32)
+        self.m = len(pattern)
+        if self.m == 0:
+            raise ValueError("Pattern is empty. Cannot perform matching.")
+        self.pattern_centered = pattern.astype(np.float64) - np.mean(pattern)
+        self.pattern_std = float(np.std(self.pattern_centered))
+        self.pattern_energy = float(np.sum(self.pattern_centered ** 2))
+        self.distance = max(1, distance_factor * self.m)
+        self.block_fft = self.backend.next_fast_len(BLOCK_FACTOR * self.m)
+        self._spectra = {}
+        for nfft in fft_sizes:
+            self.spectrum(nfft)
+
+    @classmethod
+    def from_file(cls, path, sr, cache=None, **kwargs):
+        """Matcher for the pattern decoded from path (ffmpeg, through the cache if given)."""
+        return cls(decode_cached(path, sr, cache), sr, **kwargs)
+
+    def spectrum(self, nfft):
+        """rfft of the reversed centered pattern at size nfft (computed once per size)."""
+        spec = self._spectra.get(nfft)
+        if spec is None:
+            spec = self._spectra[nfft] = self.backend.rfft(self.pattern_centered[::-1], nfft)
+        return spec
+
+    def fft_size(self, n):
+        """One FFT over the whole signal when it is short, overlap-save blocks otherwise."""
+        return min(self.backend.next_fast_len(n), self.block_fft)
+
+    def ncc(self, search, start=0, count=None, nfft=None):
+        """
+        (ncc, window sums of squares) for the offsets start .. start+count-1 of search
+        (default: every valid offset). Overlap-save blocks begin at start and the window
+        statistics are anchored at absolute ANCHOR_BLOCK multiples, so computing a range
+        whose start is a multiple of the block step gives bit-identical values to the
+        same offsets of a full run with the same nfft.
+        """
+        search = np.asarray(search, dtype=np.float32)
+        if count is None:
+            count = len(search) - self.m + 1 - start
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0)
+        nfft = nfft or self.fft_size(len(search))
+        return self._ncc_into(search, start, count, nfft, np.empty(count, dtype=np.float32),
+                              np.empty(count, dtype=np.float64))
+
+    def _ncc_into(self, search, start, count, nfft, out, numerator, scale=None):
+        """
+        ncc() into caller-owned buffers (out: float32, numerator: float64, both >= count).
+        scale divides every sample read, as peak_normalize would, without a normalized copy.
+        Returns (out[:count], window sums of squares).
+        """
+        m = self.m
+        step = nfft - m + 1
+        spec = self.spectrum(nfft)
+        out, numerator = out[:count], numerator[:count]
+        for offset in range(0, count, step):
+            block_start = start + offset
+            block_count = min(step, count - offset)
+            segment = search[block_start : block_start + nfft]
+            spectrum = self.backend.rfft(segment if scale is None else segment / scale, nfft)
+            spectrum *= spec
+            block = self.backend.irfft(spectrum, nfft)
+            numerator[offset : offset + block_count] = block[m - 1 : m - 1 + block_count]
+        anchor = start - start % ANCHOR_BLOCK
+        segment = search[anchor : start + count + m - 1]
+        sums, sums_sq = BlockedPrefixSums(segment if scale is None else segment / scale).window_sums(
+            m, start - anchor, count)
+        return normalize_correlation(numerator, sums, sums_sq, m, self.pattern_energy, out=out), sums_sq
+
+    def prepare(self, search):
+        """Search signal as the matcher scores it (float32, peak-normalized if enabled)."""
+        return peak_normalize(search) if self.normalize else np.asarray(search, dtype=np.float32)
+
+    def pick(self, ncc, sums_sq):
+        """find_peaks over a full NCC array -> [(start_time, end_time, similarity, rms), ...]."""
+        if len(ncc) == 0:
+            return []
+        peaks, _ = find_peaks(ncc, height=self.height, distance=self.distance)
+        m, sr = self.m, self.sr
+        return [(p / sr, (p + m) / sr, float(ncc[p]), float(np.sqrt(sums_sq[p] / m))) for p in peaks]
+
+    def search(self, search):
+        """Matches in an array at self.sr: [(start_time, end_time, similarity, rms), ...]."""
+        if self.pattern_std < 1e-9:  # silent/constant pattern: no matches possible
+            return []
+        if self.low_memory:
+            return self.search_chunked(search)
+        return self.pick(*self.ncc(self.prepare(search)))
+
+    def search_chunked(self, search):
+        """
+        search() without any full-length temporaries: the normalized copy, the NCC
+        array and its window statistics are replaced by chunk-sized buffers allocated
+        once, and peaks are settled by a StreamingPeakPicker as each chunk is scored.
+        Chunks start at multiples of the block step, so the scores are bit-identical.
+        """
+        search = np.asarray(search, dtype=np.float32)
+        m, n = self.m, len(search)
+        n_out = n - m + 1
+        if n_out <= 0:
+            return []
+        scale = None
+        if self.normalize and n:
+            peak = max(search.max(), -search.min())  # max|x| without an |x| copy
+            scale = peak if peak > 0 else None
+        nfft = self.fft_size(n)
+        step = nfft - m + 1
+        chunk = step * max(1, ANCHOR_BLOCK // step)
+        out = np.empty(min(chunk, n_out), dtype=np.float32)
+        numerator = np.empty(len(out), dtype=np.float64)
+        picker = StreamingPeakPicker(self.height, self.distance)
+        peaks = []
+        for start in range(0, n_out, chunk):
+            ncc, sums_sq = self._ncc_into(search, start, min(chunk, n_out - start), nfft, out, numerator, scale)
+            peaks += picker.push(start, ncc, sums_sq)
+        peaks += picker.flush()
+        return [(p / self.sr, (p + m) / self.sr, sim, float(np.sqrt(sum_sq / m))) for p, sim, sum_sq in peaks]
+
+    def search_file(self, path, cache=None):
+        """Matches in the audio file at path, decoded at self.sr (through the cache if given)."""
+        return self.search(decode_cached(path, self.sr, cache))
@@ -0,0 +1,64 @@
+import numpy as np
+from scipy.signal import fftconvolve
+
+from .stats import sliding_window_sums
+
+# ---- Vectorized sliding-window statistics and cross-correlation ----
+# Same approach as fftconvol-with-soundfile.py: FFT for the numerator,
+# cumulative sums for the per-window norms, so every offset is scored at once.
+
+def cross_correlate_valid(x, kernel):
+    """dot(kernel, x[i:i+len(kernel)]) for every valid offset i, via FFT."""
+    return fftconvolve(x, kernel[::-1], mode='valid')
+
+def envelope_match(pattern, source):
+    """
+    Scores every offset of pattern in source.
+    Equivalent to the per-offset loop
+        dot(p, w - w.mean()) / (norm(w) * norm(p) + 1e-9)
+    with p = pattern - pattern.mean() and w = source[i:i+len(p)].
+    """
+    pattern = np.asarray(pattern, dtype=np.float64)
+    source = np.asarray(source, dtype=np.float64)
+    m = len(pattern)
+    if m == 0 or m > len(source):
+        return np.zeros(0)
+
+    p = pattern - pattern.mean()
+    sums, sums_sq = sliding_window_sums(source, m)
+    # dot(p, w - mean(w)) = dot(p, w) - mean(w) * sum(p); sum(p) is ~0 but kept for exactness
+    numerator = cross_correlate_valid(source, p) - (sums / m) * p.sum()
+    return numerator / (np.sqrt(sums_sq) * np.linalg.norm(p) + 1e-9)
+
+def normalize_correlation(numerator, sums, sums_sq, m, pattern_energy, out=None):
+    """
+    NCC from the correlation with the centered pattern and the window sums,
+    with the same epsilon, masking and clipping as fftconvol-with-soundfile.py.
+    Written into `out` (float32) when given. The denominator is built in place in
+    one float64 scratch array instead of one temporary per step, with identical results.
+    """
+    if out is None:
+        out = np.empty(len(numerator), dtype=np.float32)
+    # denominator = sqrt(max(0, sums_sq/m - (sums/m)**2) * m) * sqrt(pattern_energy) + 1e-9
+    denominator = np.divide(sums, m)
+    np.square(denominator, out=denominator)
+    np.subtract(sums_sq / m, denominator, out=denominator)
+    np.maximum(denominator, 0.0, out=denominator)
+    denominator *= m
+    np.sqrt(denominator, out=denominator)
+    denominator *= np.sqrt(pattern_energy)
+    denominator += 1e-9
+
+    valid_den_mask = denominator > 1e-8
+    np.divide(numerator, denominator, out=denominator, where=valid_den_mask)
+    out.fill(0.0)
+    np.copyto(out, denominator, where=valid_den_mask)
+    return np.clip(out, -1.0, 1.0, out=out)
+
+def normalized_cross_correlation(search, pattern):
+    """Full-signal NCC of pattern against search (len(search)-len(pattern)+1 scores)."""
+    m = len(pattern)
+    pattern_centered = np.asarray(pattern, dtype=np.float64) - np.mean(pattern)
+    numerator = cross_correlate_valid(search, pattern_centered)
+    sums, sums_sq = sliding_window_sums(search, m)
+    return normalize_correlation(numerator, sums, sums_sq, m, np.sum(pattern_centered ** 2))
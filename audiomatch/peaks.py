@@ -0,0 +1,77 @@
+import heapq
+import bisect
+import numpy as np
+
+POOL_FACTOR = 8  # candidates drawn per requested peak before suppression needs a wider pool
+
+def local_maxima(scores):
+    """Indices i (0 < i < len-1) with scores[i-1] < scores[i] > scores[i+1]."""
+    scores = np.asarray(scores)
+    if len(scores) < 3:
+        return np.zeros(0, dtype=np.intp)
+    interior = scores[1:-1]
+    return np.flatnonzero((interior > scores[:-2]) & (interior > scores[2:])) + 1
+
+def select_by_distance(peaks, heights, distance):
+    """
+    Mask of the peaks kept by find_peaks' distance rule: highest first, each kept
+    peak removes the others closer than ceil(distance). Equal heights are taken
+    in time order from the latest, the order scipy's argsort gives when it keeps
+    ties in place (its default sort does not guarantee that, so on exact ties
+    find_peaks itself may keep either peak).
+    """
+    peaks = np.asarray(peaks)
+    keep = np.ones(len(peaks), dtype=bool)
+    gap = np.ceil(distance)
+    for i in np.argsort(heights, kind="stable")[::-1]:
+        if keep[i]:
+            lo = np.searchsorted(peaks, peaks[i] - gap, side="right")
+            hi = np.searchsorted(peaks, peaks[i] + gap, side="left")
+            keep[lo:hi] = False
+            keep[i] = True
+    return keep
+
+def _top_positions(values, count):
+    """Positions of the `count` largest values (unordered); ties at the cut go to the lowest positions."""
+    if count >= len(values):
+        return np.arange(len(values))
+    kth = np.partition(values, len(values) - count)[len(values) - count]
+    better = np.flatnonzero(values > kth)
+    tied = np.flatnonzero(values == kth)[: count - len(better)]
+    return np.concatenate((better, tied))
+
+def top_k_peaks(scores, k, min_distance=1):
+    """
+    Indices of the k highest strict local maxima of scores, in time order.
+    Peaks closer than min_distance to a higher selected peak are suppressed,
+    the same greedy rule as find_peaks(distance=...). With min_distance=1 this
+    equals sorting every local maximum by score and keeping the first k.
+    Candidates are drawn with a partial selection (np.partition) and ordered in a heap,
+    so only a small pool is ever ranked, never all peaks.
+    """
+    scores = np.asarray(scores)
+    peaks = local_maxima(scores)
+    if k <= 0 or len(peaks) == 0:
+        return np.zeros(0, dtype=np.intp)
+    values = scores[peaks]
+    if min_distance <= 1:
+        return np.sort(peaks[_top_positions(values, k)])
+
+    selected = []  # sorted, for the neighbour check
+    used = np.zeros(len(peaks), dtype=bool)
+    pool_size = POOL_FACTOR * k
+    while len(selected) < k and not used.all():
+        # Widen the pool; every new candidate ranks below all earlier ones
+        fresh = _top_positions(values, min(pool_size, len(peaks)))
+        fresh = fresh[~used[fresh]]
+        used[fresh] = True
+        heap = [(-values[j], int(peaks[j])) for j in fresh]  # ties pop in time order
+        heapq.heapify(heap)
+        while heap and len(selected) < k:
+            _, i = heapq.heappop(heap)
+            pos = bisect.bisect_left(selected, i)
+            if (pos == 0 or i - selected[pos - 1] >= min_distance) and \
+               (pos == len(selected) or selected[pos] - i >= min_distance):
+                selected.insert(pos, i)
+        pool_size *= 2
+    return np.array(selected, dtype=np.intp)
@@ -0,0 +1,158 @@
+"""
+Machine-readable match results with search coverage, for incremental re-search.
+
+Records are appended to a JSON Lines file, one object per line:
+    {"type": "match", "run": ..., "source": path, "source_hash": ..., "pattern_hash": ...,
+     "sr": ..., "method": ..., "offset": samples, "start": s, "end": s, "similarity": ..., "rms": ...}
+    {"type": "coverage", "run": ..., "source": path, "pattern_hash": ..., "params": {...},
+     "from": offset, "until": offset, "n_samples": ..., "check": digest, "scale": ...}
+A coverage record says which offsets a run scored and by what the samples were
+divided before scoring (their peak when the matcher normalizes, else 1). When the source has grown
+since (same samples up to the covered length), only the new tail is searched,
+starting one peak neighbourhood before the old end, and the new run's matches
+replace the old ones from that offset on. to_parquet() exports the matches
+when pyarrow is installed.
+"""
+import hashlib
+import json
+import math
+import os
+import uuid
+import numpy as np
+
+from .cache import file_digest
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is unavailable
+    pyarrow = None
+
+CHECK_SAMPLES = 1 << 16  # samples hashed at each end of the covered region
+MATCH_FIELDS = ("source", "source_hash", "pattern_hash", "sr", "method", "offset",
+                "start", "end", "similarity", "rms")
+
+def samples_digest(samples):
+    """Content hash of a float32 signal (blake2b, hex)."""
+    return hashlib.blake2b(np.ascontiguousarray(samples, dtype=np.float32).tobytes(), digest_size=20).hexdigest()
+
+def coverage_check(samples, n):
+    """
+    Digest of the first and last CHECK_SAMPLES of samples[:n]: cheap evidence that a
+    grown source still starts with the samples a previous run covered.
+    """
+    head = samples[: min(n, CHECK_SAMPLES)]
+    tail = samples[max(0, n - CHECK_SAMPLES) : n]
+    return samples_digest(np.concatenate((head, tail))) + f":{n}"
+
+class ResultStore:
+    """Append-only JSON Lines store of match and coverage records."""
+    def __init__(self, path):
+        self.path = path
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def append(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def coverage(self, source, pattern_hash, params):
+        """Latest coverage record of source for this pattern and these parameters, or None."""
+        latest = None
+        for record in self.records():
+            if (record["type"] == "coverage" and record["source"] == source
+                    and record["pattern_hash"] == pattern_hash and record["params"] == params):
+                latest = record
+        return latest
+
+    def matches(self, source=None, pattern_hash=None):
+        """
+        Current match records (optionally filtered), in offset order. Runs are replayed
+        in the order of their coverage records: a run replaces the earlier matches of the
+        same source, pattern and parameters from its "from" offset on, and matches on
+        both sides of that offset closer than the peak distance keep only the better one.
+        Matches of a run without a coverage record (interrupted write) are ignored.
+        """
+        by_run, runs = {}, []
+        for record in self.records():
+            if source is not None and record["source"] != source:
+                continue
+            if pattern_hash is not None and record["pattern_hash"] != pattern_hash:
+                continue
+            if record["type"] == "match":
+                by_run.setdefault(record["run"], []).append(record)
+            elif record["type"] == "coverage":
+                runs.append(record)
+
+        current = {}
+        for run in runs:
+            key = (run["source"], run["pattern_hash"], json.dumps(run["params"], sort_keys=True))
+            merged = [m for m in current.get(key, []) if m["offset"] < run["from"]] + by_run.get(run["run"], [])
+            kept = []
+            for m in sorted(merged, key=lambda m: m["similarity"], reverse=True):
+                if all(abs(m["offset"] - k["offset"]) >= run["params"]["distance"] for k in kept):
+                    kept.append(m)
+            current[key] = sorted(kept, key=lambda m: m["offset"])
+        return [m for matches in current.values() for m in matches]
+
+    def to_parquet(self, path, source=None, pattern_hash=None):
+        """Write the current matches to a Parquet file (needs pyarrow)."""
+        if pyarrow is None:
+            raise ImportError("pyarrow is not installed (pip install pyarrow).")
+        rows = self.matches(source, pattern_hash)
+        table = pyarrow.table({name: [row[name] for row in rows] for name in MATCH_FIELDS})
+        pyarrow.parquet.write_table(table, path)
+
+def incremental_search(store, matcher, source, samples, method="ncc"):
+    """
+    Search samples (decoded from the file `source`) with matcher, reusing the store's
+    coverage: a source unchanged since the last run is not searched again, and a source
+    that has only grown is searched from just before the old end.
+    Returns the list of current match records for source and pattern.
+    The samples are prepared as Matcher.search prepares them, so RMS is the same as
+    in the other modes. When the grown source is normalized by a different peak than
+    before, earlier RMS values no longer compare and the whole source is searched again.
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    prepared = matcher.prepare(samples)
+    scale = float(np.max(np.abs(samples))) if matcher.normalize and len(samples) else 0.0
+    scale = scale if scale > 0 else 1.0
+    m, n = matcher.m, len(samples)
+    n_out = max(0, n - m + 1)
+    pattern_hash = samples_digest(matcher.pattern_centered)
+    params = {"sr": matcher.sr, "method": method, "height": matcher.height, "distance": matcher.distance,
+              "normalize": matcher.normalize}
+
+    start = 0
+    previous = store.coverage(source, pattern_hash, params)
+    if previous and previous["n_samples"] <= n and \
+            coverage_check(samples, previous["n_samples"]) == previous["check"] and \
+            previous.get("scale", 1.0) == scale:
+        if previous["n_samples"] == n:
+            return store.matches(source, pattern_hash)
+        # Offsets near the old end may now become (or be suppressed by) peaks: redo one neighbourhood
+        start = max(0, previous["until"] - 2 * math.ceil(matcher.distance) - 1)
+
+    run = uuid.uuid4().hex
+    source_hash = file_digest(source) if os.path.exists(source) else None
+    records = []
+    if matcher.pattern_std >= 1e-9 and n_out > start:
+        ncc, sums_sq = matcher.ncc(prepared, start)
+        for s, _, sim, rms in matcher.pick(ncc, sums_sq):
+            offset = start + round(s * matcher.sr)
+            records.append({"type": "match", "run": run, "source": source, "source_hash": source_hash,
+                            "pattern_hash": pattern_hash, "sr": matcher.sr, "method": method,
+                            "offset": offset, "start": offset / matcher.sr, "end": (offset + m) / matcher.sr,
+                            "similarity": sim, "rms": rms})
+    records.append({"type": "coverage", "run": run, "source": source, "pattern_hash": pattern_hash,
+                    "params": params, "from": start, "until": n_out, "n_samples": n,
+                    "check": coverage_check(samples, n), "scale": scale})
+    store.append(records)
+    return store.matches(source, pattern_hash)
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from scipy.signal import find_peaks
+
+from .stats import ANCHOR_BLOCK, BlockedPrefixSums
+
+SHARDS_PER_WORKER = 4  # more shards than workers keeps the pool busy when shards finish unevenly
+MIN_SHARD_BLOCKS = 8   # overlap-save blocks per shard at the least
+
+# ---- Multi-process sharded NCC ----
+# The search signal is placed once in shared memory and every worker writes its
+# NCC range into one shared output array. Shards start at multiples of the
+# matcher's overlap-save step and use its FFT size, and window statistics are
+# anchored at absolute ANCHOR_BLOCK multiples, so each score is bit-identical to
+# the single-process run. Peaks are then picked once over the whole array, which
+# gives exactly find_peaks' distance semantics with no per-shard merging.
+
+_worker = {}
+
+def _init_worker(matcher, search_name, n, ncc_name, n_out, nfft):
+    search_shm = shared_memory.SharedMemory(name=search_name)
+    ncc_shm = shared_memory.SharedMemory(name=ncc_name)
+    _worker.update(
+        matcher=matcher, nfft=nfft, shms=(search_shm, ncc_shm),
+        search=np.ndarray((n,), dtype=np.float32, buffer=search_shm.buf),
+        ncc=np.ndarray((n_out,), dtype=np.float32, buffer=ncc_shm.buf),
+    )
+    matcher.spectrum(nfft)  # once per worker, not per shard
+
+def _score_shard(start, count):
+    ncc, _ = _worker["matcher"].ncc(_worker["search"], start, count, _worker["nfft"])
+    _worker["ncc"][start : start + count] = ncc
+    return count
+
+def shard_ranges(n_out, step, workers, shards_per_worker=SHARDS_PER_WORKER):
+    """(start, count) ranges covering n_out offsets; every start is a multiple of step."""
+    blocks = -(-n_out // step)
+    per_shard = max(MIN_SHARD_BLOCKS, -(-blocks // (workers * shards_per_worker))) * step
+    return [(start, min(per_shard, n_out - start)) for start in range(0, n_out, per_shard)]
+
+def window_sum_sq(search, m, offset):
+    """Sum of squares of search[offset:offset+m], computed as in the full-signal window statistics."""
+    anchor = offset - offset % ANCHOR_BLOCK
+    return BlockedPrefixSums(search[anchor : offset + m]).window_sums(m, offset - anchor, 1)[1][0]
+
+def sharded_search(matcher, search, workers=None):
+    """
+    Matcher.search split over a process pool; returns the same matches as
+    matcher.search(search), bit for bit. workers defaults to os.cpu_count().
+    """
+    workers = workers or os.cpu_count() or 1
+    if matcher.pattern_std < 1e-9:  # silent/constant pattern: no matches possible
+        return []
+    n, m = len(search), matcher.m
+    n_out = n - m + 1
+    if n_out <= 0:
+        return []
+    nfft = matcher.fft_size(n)
+    ranges = shard_ranges(n_out, nfft - m + 1, workers)
+    if workers == 1 or len(ranges) == 1:
+        return matcher.search(search)
+
+    search_shm = shared_memory.SharedMemory(create=True, size=n * 4)
+    ncc_shm = shared_memory.SharedMemory(create=True, size=n_out * 4)
+    try:
+        shared_search = np.ndarray((n,), dtype=np.float32, buffer=search_shm.buf)
+        shared_search[:] = matcher.prepare(search)
+        ncc = np.ndarray((n_out,), dtype=np.float32, buffer=ncc_shm.buf)
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), initializer=_init_worker,
+                                 initargs=(matcher, search_shm.name, n, ncc_shm.name, n_out, nfft)) as pool:
+            list(pool.map(_score_shard, *zip(*ranges)))
+
+        peaks, _ = find_peaks(ncc, height=matcher.height, distance=matcher.distance)
+        sr = matcher.sr
+        matches = [(p / sr, (p + m) / sr, float(ncc[p]), float(np.sqrt(window_sum_sq(shared_search, m, p) / m)))
+                   for p in peaks]
+        del shared_search, ncc  # release the buffer views before closing
+    finally:
+        for shm in (search_shm, ncc_shm):
+            shm.close()
+            shm.unlink()
+    return matches
@@ -0,0 +1,48 @@
+import numpy as np
+from scipy import fft as sp_fft
+
+BLOCK_FACTOR = 8  # overlap-save FFT length is about BLOCK_FACTOR pattern widths
+
+def spectrogram_match(pat, src, block_factor=BLOCK_FACTOR, workers=-1):
+    """
+    Normalized 2-D template match of a (freq x w) spectrogram over a (freq x n) one.
+    Returns one score per frame offset i in range(n - w), equal to the loop
+        v = src[:, i:i+w].flatten(); v -= v.mean()
+        dot(v, p) / (norm(v) * norm(p) + 1e-10)
+    with p = pat.flatten() - pat.mean().
+    Every frequency row is correlated by overlap-save FFTs and the rows are summed
+    in the frequency domain, so one inverse FFT per block covers all its offsets.
+    """
+    n_freq, w = pat.shape
+    n = src.shape[1]
+    n_out = n - w
+    if n_out <= 0:
+        return np.zeros(0)
+
+    src = np.asarray(src, dtype=np.float32)
+    p = pat.astype(np.float64) - pat.mean(dtype=np.float64)
+    pn = np.linalg.norm(p)
+
+    nfft = sp_fft.next_fast_len(block_factor * w, real=True)
+    step = nfft - w + 1
+    pat_spec = sp_fft.rfft(p[:, ::-1].astype(np.float32), nfft, axis=1, workers=workers)
+
+    numerator = np.empty(n_out, dtype=np.float64)
+    for start in range(0, n_out, step):
+        block_spec = sp_fft.rfft(src[:, start : start + nfft], nfft, axis=1, workers=workers)
+        row_sum = np.einsum('fk,fk->k', block_spec, pat_spec)
+        count = min(step, n_out - start)
+        numerator[start : start + count] = sp_fft.irfft(row_sum, nfft, workers=workers)[w - 1 : w - 1 + count]
+
+    # Window sums over all rows come from per-frame column totals
+    col_sum = src.sum(axis=0, dtype=np.float64)
+    col_sq = np.einsum('fk,fk->k', src, src, dtype=np.float64)
+    csum = np.concatenate(([0.0], np.cumsum(col_sum)))
+    csum_sq = np.concatenate(([0.0], np.cumsum(col_sq)))
+    win_sum = (csum[w:] - csum[:-w])[:n_out]
+    win_sq = (csum_sq[w:] - csum_sq[:-w])[:n_out]
+    size = n_freq * w
+
+    numerator -= (win_sum / size) * p.sum()
+    centered_sq = np.maximum(win_sq - win_sum * win_sum / size, 0.0)
+    return numerator / (np.sqrt(centered_sq) * pn + 1e-10)
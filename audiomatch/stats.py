@@ -0,0 +1,93 @@
+import math
+import numpy as np
+
+ANCHOR_BLOCK = 1 << 16  # samples per re-anchored prefix-sum block
+
+# ---- Drift-free sliding window statistics ----
+# A single running cumsum over tens of millions of samples (float32 in the
+# original script, but float64 drifts too) makes late window sums the
+# difference of two huge, already-rounded totals: quiet windows lose all their
+# digits and their variance gets clamped to 0. Here the prefix sums restart at
+# every ANCHOR_BLOCK samples, so a window sum only ever combines values of
+# block size; a window crossing a block edge adds that block's own total.
+
+class BlockedPrefixSums:
+    """Prefix sums of x and x**2, re-anchored every `block` samples."""
+    def __init__(self, x, block=ANCHOR_BLOCK):
+        x = np.asarray(x)
+        self.n = len(x)
+        self.block = block
+        n_blocks = -(-self.n // block) if self.n else 0
+        # local[i] = sum of x[block_start(i):i]; one extra slot for i == n
+        self._local = np.zeros(self.n + 1)
+        self._local_sq = np.zeros(self.n + 1)
+        self._totals = np.zeros(n_blocks)
+        self._totals_sq = np.zeros(n_blocks)
+        for b in range(n_blocks):
+            lo, hi = b * block, min((b + 1) * block, self.n)
+            seg = x[lo:hi].astype(np.float64)
+            csum = np.cumsum(seg)
+            csum_sq = np.cumsum(seg * seg)
+            self._local[lo + 1 : hi] = csum[:-1]
+            self._local_sq[lo + 1 : hi] = csum_sq[:-1]
+            self._totals[b], self._totals_sq[b] = csum[-1], csum_sq[-1]
+        if self.n % block:
+            # the end index n lives inside the last, partial block
+            self._local[self.n] = self._totals[-1]
+            self._local_sq[self.n] = self._totals_sq[-1]
+
+    def window_sums(self, m, start=0, count=None):
+        """Sum and sum of squares of the length-m windows starting at start .. start+count-1."""
+        if count is None:
+            count = self.n - m + 1 - start
+        if count <= 0:
+            return np.zeros(0), np.zeros(0)
+        sums = self._local[start + m : start + m + count] - self._local[start : start + count]
+        sums_sq = self._local_sq[start + m : start + m + count] - self._local_sq[start : start + count]
+        # Windows i with i < k*block <= i + m cross block boundary k: add that block's total
+        first = start // self.block + 1
+        last = (start + count - 1 + m) // self.block
+        for k in range(first, last + 1):
+            edge = k * self.block
+            lo, hi = max(edge - m, start) - start, min(edge, start + count) - start
+            sums[lo:hi] += self._totals[k - 1]
+            sums_sq[lo:hi] += self._totals_sq[k - 1]
+        return sums, np.maximum(sums_sq, 0.0)
+
+    def range_sums(self, lo, hi):
+        """Sum and sum of squares of x[lo:hi] for arrays of bounds (any lengths, lo <= hi)."""
+        lo, hi = np.asarray(lo, dtype=np.int64), np.asarray(hi, dtype=np.int64)
+        # Whole blocks between the two ends come from the per-block totals
+        before = np.concatenate(([0.0], np.cumsum(self._totals)))
+        before_sq = np.concatenate(([0.0], np.cumsum(self._totals_sq)))
+        b_lo, b_hi = lo // self.block, hi // self.block
+        sums = self._local[hi] - self._local[lo] + (before[b_hi] - before[b_lo])
+        sums_sq = self._local_sq[hi] - self._local_sq[lo] + (before_sq[b_hi] - before_sq[b_lo])
+        return sums, np.maximum(sums_sq, 0.0)
+
+def sliding_window_sums(x, m, block=ANCHOR_BLOCK):
+    """Sum and sum of squares of every length-m window of x (float64, len(x)-m+1 values)."""
+    return BlockedPrefixSums(x, block).window_sums(m)
+
+def window_sums_error(x, m, sums, sums_sq, n_checks=256):
+    """
+    Max absolute and relative error of (sums, sums_sq) against an exact
+    math.fsum reference, at n_checks offsets spread over the signal
+    (always including the last window, where cumulative drift is worst).
+    """
+    n_out = len(sums)
+    if n_out == 0:
+        return {"max_abs_err_sum": 0.0, "max_abs_err_sum_sq": 0.0, "max_rel_err_sum_sq": 0.0}
+    offsets = np.unique(np.linspace(0, n_out - 1, min(n_checks, n_out)).astype(np.int64))
+    x = np.asarray(x, dtype=np.float64)
+    err_sum = err_sq = rel_sq = 0.0
+    for i in offsets:
+        window = x[i : i + m]
+        exact = math.fsum(window)
+        exact_sq = math.fsum(window * window)
+        err_sum = max(err_sum, abs(sums[i] - exact))
+        err = abs(sums_sq[i] - exact_sq)
+        err_sq = max(err_sq, err)
+        if exact_sq > 0:
+            rel_sq = max(rel_sq, err / exact_sq)
+    return {"max_abs_err_sum": err_sum, "max_abs_err_sum_sq": err_sq, "max_rel_err_sum_sq": rel_sq}
@@ -0,0 +1,207 @@
+import math
+import subprocess
+import numpy as np
+from scipy import fft as sp_fft
+from scipy.signal import find_peaks
+
+from .decode import ffmpeg_command, read_into
+from .ncc import sliding_window_sums, normalize_correlation
+from .peaks import select_by_distance
+
+try:
+    import soundfile as sf
+except ImportError:  # ffmpeg pipe is used instead
+    sf = None
+
+DEFAULT_BLOCK = 1 << 16  # search samples per block
+
+# ---- Block readers ----
+
+def iter_ffmpeg_blocks(path, sr, block_size=DEFAULT_BLOCK):
+    """Decode path to mono float32 at sr through an ffmpeg pipe, block_size samples at a time."""
+    with subprocess.Popen(ffmpeg_command(path, sr), stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL) as proc:
+        while True:
+            block = np.empty(block_size, dtype=np.float32)
+            view = memoryview(block).cast('B')
+            filled = read_into(proc.stdout, view)
+            if filled:
+                yield block[: filled // 4]
+            if filled < len(view):
+                break
+
+def iter_audio_blocks(path, sr, block_size=DEFAULT_BLOCK):
+    """
+    Mono float32 blocks of path at sr. Uses soundfile.blocks when the file is
+    already at sr (no resampling needed), otherwise an ffmpeg pipe resamples on the fly.
+    """
+    if sf is not None:
+        try:
+            native_sr = sf.info(path).samplerate
+        except Exception:
+            native_sr = None
+        if native_sr == sr:
+            for block in sf.blocks(path, blocksize=block_size, dtype='float32', always_2d=True):
+                yield block.mean(axis=1, dtype=np.float32)
+            return
+    yield from iter_ffmpeg_blocks(path, sr, block_size)
+
+def read_audio(path, sr):
+    """Whole file as one mono float32 array (for short inputs such as the pattern)."""
+    blocks = list(iter_audio_blocks(path, sr))
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+
+# ---- Overlap-save correlator ----
+
+class StreamingNCC:
+    """
+    NCC of a fixed pattern against a signal that arrives block by block.
+    The centered pattern's FFT is computed once; each pushed block is correlated
+    overlap-save style, keeping the last M-1 samples so windows that straddle
+    block edges are scored exactly once. Window statistics are computed over
+    carried tail + block, so they never accumulate drift across the stream.
+    """
+    def __init__(self, pattern, fft_size=None):
+        pattern = np.asarray(pattern, dtype=np.float64)
+        self.m = len(pattern)
+        if self.m == 0:
+            raise ValueError("Pattern is empty. Cannot perform matching.")
+        pattern_centered = pattern - pattern.mean()
+        self.pattern_energy = np.sum(pattern_centered ** 2)
+        self.nfft = fft_size or sp_fft.next_fast_len(4 * self.m, real=True)
+        if self.nfft < self.m:
+            raise ValueError("fft_size must be at least the pattern length.")
+        self.step = self.nfft - self.m + 1
+        self._pattern_spec = sp_fft.rfft(pattern_centered[::-1], self.nfft)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self.position = 0  # absolute index of the next NCC value
+
+    def push(self, samples):
+        """Feed samples; returns (start_index, ncc, window_sums_sq) for every newly complete window."""
+        buf = np.concatenate((self._tail, np.asarray(samples, dtype=np.float32)))
+        n_out = len(buf) - self.m + 1
+        if n_out <= 0:
+            self._tail = buf
+            return self.position, np.zeros(0, dtype=np.float32), np.zeros(0)
+
+        ncc, sums_sq = self.score(buf)
+        start_index = self.position
+        self.position += n_out
+        self._tail = buf[n_out:].copy()
+        return start_index, ncc, sums_sq
+
+    def score(self, buf):
+        """(ncc, window_sums_sq) of every full window of buf; the stream state is not touched."""
+        n_out = len(buf) - self.m + 1
+        numerator = np.empty(n_out, dtype=np.float64)
+        for start in range(0, n_out, self.step):
+            segment_spec = sp_fft.rfft(buf[start : start + self.nfft], self.nfft)
+            count = min(self.step, n_out - start)
+            full = sp_fft.irfft(segment_spec * self._pattern_spec, self.nfft)
+            numerator[start : start + count] = full[self.m - 1 : self.m - 1 + count]
+
+        sums, sums_sq = sliding_window_sums(buf, self.m)
+        return normalize_correlation(numerator, sums, sums_sq, self.m, self.pattern_energy), sums_sq
+
+# ---- Incremental peak picking ----
+
+class StreamingPeakPicker:
+    """
+    find_peaks(height, distance) over a score stream that arrives in pieces.
+    Candidate peaks closer than `distance` form a cluster; the distance rule only
+    acts inside a cluster, so a cluster is resolved as soon as no future sample can
+    join it. Only the open cluster is held, so memory does not grow with the stream.
+    Plateaus are held whole, from the sample before they rise, so a plateau cut by
+    a block edge is reported at the same (middle) index as by find_peaks. Ties in
+    height inside a cluster follow peaks.select_by_distance.
+    """
+    def __init__(self, height, distance):
+        self.height = height
+        self.distance = max(1, distance)
+        self._gap = math.ceil(self.distance)  # find_peaks suppresses peaks closer than this
+        self._values = np.zeros(0, dtype=np.float32)
+        self._extra = np.zeros(0)
+        self._start = 0  # absolute index of _values[0]
+
+    def push(self, start_index, values, extra=None):
+        """Append scores starting at start_index; returns [(index, score, extra)] of settled peaks."""
+        if extra is None:
+            extra = np.zeros(len(values))
+        if len(self._values) == 0:
+            self._start = start_index
+        elif self._start + len(self._values) != start_index:
+            raise ValueError("Scores must be pushed contiguously.")
+        self._values = np.concatenate((self._values, values))
+        self._extra = np.concatenate((self._extra, extra))
+        return self._settle(final=False)
+
+    def flush(self):
+        """Resolve everything still held at end of stream."""
+        return self._settle(final=True)
+
+    def peek(self):
+        """
+        [(index, score, extra)] the held cluster would resolve to if the stream ended
+        now, without settling it. Later scores can still replace these peaks.
+        """
+        values = self._values
+        if len(values) == 0 or values.max() < self.height:
+            return []
+        candidates, _ = find_peaks(values, height=self.height)
+        keep = candidates[select_by_distance(candidates, values[candidates], self._gap)]
+        return [(self._start + int(i), float(values[i]), self._extra[i]) for i in keep]
+
+    def _settle(self, final):
+        values = self._values
+        if len(values) == 0:
+            return []
+        if values.max() < self.height:
+            # Nothing held can be a peak: keep only the left neighbour of what comes next
+            self._values, self._extra = values[-1:], self._extra[-1:]
+            self._start += len(values) - 1
+            return []
+        candidates, props = find_peaks(values, height=self.height, plateau_size=(None, None))
+        left_edges = props["left_edges"]
+        if final:
+            open_from = len(values)
+        else:
+            # The trailing run of equal samples (e.g. NCC clipped at 1.0) can still become
+            # a peak once the run ends; any later peak lies at or after its start.
+            differs = np.flatnonzero(values[:-1] != values[-1])
+            open_from = differs[-1] + 1 if len(differs) else 0
+            # A cluster whose last candidate is within `distance` of that may still grow
+            if len(candidates) and open_from - candidates[-1] < self._gap:
+                breaks = np.flatnonzero(np.diff(candidates) >= self._gap) + 1
+                first_open = breaks[-1] if len(breaks) else 0
+                open_from = min(open_from, left_edges[first_open])
+
+        closed = candidates[candidates < open_from]
+        keep = closed[select_by_distance(closed, values[closed], self._gap)]
+        settled = [(self._start + int(i), float(values[i]), self._extra[i]) for i in keep]
+        cut = max(open_from - 1, 0)  # keep the sample before the open region (its rising edge)
+        self._values = values[cut:]
+        self._extra = self._extra[cut:]
+        self._start += cut
+        return settled
+
+# ---- File-level streaming search ----
+
+def stream_matches(pattern, blocks, sr, height=0.7, distance=None, fft_size=None):
+    """
+    Yields (start_time, end_time, similarity, rms) for each match as soon as it is
+    settled, reading the search signal from an iterable of float32 blocks.
+    Memory stays bounded by the FFT size and the held peak cluster, not the stream length.
+    """
+    correlator = StreamingNCC(pattern, fft_size=fft_size)
+    m = correlator.m
+    picker = StreamingPeakPicker(height, distance if distance is not None else max(1, 0.25 * m))
+
+    def as_matches(peaks):
+        for idx, sim, sum_sq in peaks:
+            yield idx / sr, (idx + m) / sr, sim, float(np.sqrt(sum_sq / m))
+
+    for block in blocks:
+        start_index, ncc, sums_sq = correlator.push(block)
+        if len(ncc):
+            yield from as_matches(picker.push(start_index, ncc, sums_sq))
+    yield from as_matches(picker.flush())
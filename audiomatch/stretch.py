@@ -0,0 +1,71 @@
+from fractions import Fraction
+import numpy as np
+from scipy.signal import resample_poly
+
+from .batch import SearchSignal, search_patterns
+from .envelope import energy_envelope
+from .features import match_features
+from .stats import BlockedPrefixSums
+
+DEFAULT_SCALES = tuple(round(0.90 + 0.02 * i, 2) for i in range(11))  # 0.90 .. 1.10 in 2% steps
+ENVELOPE_HOP = 256
+
+def scaled_variants(pattern, scales=DEFAULT_SCALES):
+    """{scale: pattern resampled to round(scale * len) samples} (scale > 1: spoken slower)."""
+    pattern = np.asarray(pattern, dtype=np.float64)
+    variants = {}
+    for scale in scales:
+        ratio = Fraction(scale).limit_denominator(100)
+        variants[scale] = (pattern if ratio == 1
+                           else resample_poly(pattern, ratio.numerator, ratio.denominator))
+    return variants
+
+def stretch_search(pattern, search, sr, scales=DEFAULT_SCALES, height=0.7, distance_factor=0.25,
+                   feature="waveform"):
+    """
+    NCC search with a bank of time-scaled pattern variants.
+    Returns [(start_time, end_time, similarity, rms, scale), ...] in time order, one
+    per match, reporting the scale that correlated best.
+
+    The variants go through search_patterns as one length group: each search block
+    is transformed once and all variants come back from one batched inverse FFT,
+    with window statistics from shared prefix sums.
+    feature="envelope" matches RMS envelopes (hop ENVELOPE_HOP) instead of samples:
+    coarser in time, but insensitive to pitch, so it also catches speed changes
+    that keep the pitch (where resampled waveform variants do not line up).
+    """
+    search = np.asarray(search, dtype=np.float32)
+    if feature == "envelope":
+        hop = ENVELOPE_HOP
+        source = SearchSignal(energy_envelope(search, 2 * hop, hop))
+        base = energy_envelope(pattern, 2 * hop, hop)
+    elif feature == "waveform":
+        hop = 1
+        source = SearchSignal(search)
+        base = pattern
+    else:
+        raise ValueError(f"Unknown feature '{feature}' (waveform or envelope).")
+
+    variants = scaled_variants(base, scales)
+    found = search_patterns(variants, source, sr / hop, height=height, distance_factor=distance_factor)
+
+    # Same place matched by several scales: keep the best one (greedy, like find_peaks' distance)
+    candidates = sorted(((sim, round(start * sr), scale) for scale, matches in found.items()
+                         for start, _, sim, _ in matches), reverse=True)
+    kept = []
+    for sim, start, scale in candidates:
+        m = round(scale * len(pattern))
+        if all(abs(start - other) >= distance_factor * max(m, other_m) for _, other, _, other_m in kept):
+            kept.append((sim, start, scale, m))
+    kept.sort(key=lambda match: match[1])
+    if not kept:
+        return []
+
+    # RMS on the samples, one vectorized call per pattern length, sharing one prefix-sum pass
+    prefix = source if feature == "waveform" else BlockedPrefixSums(search)
+    rms = np.empty(len(kept))
+    for m in {match[3] for match in kept}:
+        idx = [i for i, match in enumerate(kept) if match[3] == m]
+        rms[idx] = match_features(search, [kept[i][1] for i in idx], m, prefix=prefix)["rms"]
+    return [(start / sr, (start + m) / sr, sim, float(r), scale)
+            for (sim, start, scale, m), r in zip(kept, rms)]
@@ -0,0 +1,29 @@
+import multiprocessing
+import os
+import time
+
+from audiomatch import bench
+
+def _crash(queue):
+    os._exit(137)  # as if killed for running out of memory
+
+def _hang(queue):
+    time.sleep(60)
+
+def _finish(queue):
+    queue.put({"method": "ok"})
+
+def wait(target, timeout=None):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=target, args=(queue,))
+    proc.start()
+    result = bench._wait_result(target.__name__, proc, queue, timeout)
+    proc.join()
+    return result
+
+def test_wait_result(monkeypatch):
+    monkeypatch.setattr(bench, "POLL_SECONDS", 0.1)
+    assert wait(_finish) == {"method": "ok"}
+    assert wait(_crash)["error"] == "process exited with code 137 without a result"
+    assert wait(_hang, timeout=0.5)["error"] == "timed out after 0.5s"
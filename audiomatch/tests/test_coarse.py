@@ -0,0 +1,18 @@
+import numpy as np
+
+from audiomatch.bench import make_workload
+from audiomatch.coarse import DEFAULT_LEVELS, coarse_to_fine_search
+from audiomatch.matcher import Matcher
+
+def test_more_matches_than_kept_candidates():
+    sr = 4000
+    copies = 30
+    assert copies > max(keep for _, keep in DEFAULT_LEVELS[1:])
+    pattern, search, truth = make_workload(seed=0, sr=sr, duration=600.0, copies=copies)
+    full = Matcher(pattern, sr).search(search)
+    matches, stats = coarse_to_fine_search(pattern, search, sr)
+
+    assert len(full) == copies
+    assert [round(start * sr) for start, _, _, _ in matches] == [round(start * sr) for start, _, _, _ in full]
+    assert np.allclose([sim for _, _, sim, _ in matches], [sim for _, _, sim, _ in full], atol=1e-4)
+    assert stats["full_rate_fraction"] < 0.2
@@ -0,0 +1,23 @@
+import numpy as np
+
+from audiomatch.features import peak_amplitudes
+
+def test_peaks_of_ranges_near_the_end():
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(1000).astype(np.float32)
+    x[-3] = 9.0    # loudest sample, only inside ranges reaching the last few samples
+    x[-40] = -7.0
+    lo = np.array([0, 500, 900, 950, 960, 990, 997, 998, 999])
+    hi = np.array([100, 1000, 1000, 999, 1000, 1000, 998, 1000, 1000])
+    expected = [np.abs(x[a:b]).max() for a, b in zip(lo, hi)]
+    assert np.array_equal(peak_amplitudes(x, lo, hi), expected)
+
+def test_random_ranges_match_slices():
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        n = int(rng.integers(1, 300))
+        x = rng.standard_normal(n).astype(np.float32)
+        lo = np.sort(rng.integers(0, n, size=int(rng.integers(1, 20))))
+        hi = np.minimum(lo + rng.integers(1, 50, size=len(lo)), n)
+        expected = [np.abs(x[a:b]).max() for a, b in zip(lo, hi)]
+        assert np.array_equal(peak_amplitudes(x, lo, hi), expected)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from audiomatch import decode
+from audiomatch.bench import make_workload
+from audiomatch.cache import AudioCache
+from audiomatch.fingerprint import FingerprintIndex
+
+SR = 8000
+
+@pytest.fixture(scope="module")
+def library():
+    """Three 120 s sources, each with a 2 s pattern planted six times."""
+    sources, truths = [], []
+    for seed in range(3):
+        pattern, search, offsets = make_workload(seed=seed, sr=SR, duration=120, pattern_seconds=2.0)
+        sources.append(search)
+        truths.append((pattern, sorted(int(o) for o in offsets)))
+    return sources, truths
+
+def test_search_loads_each_source_once(library):
+    sources, truths = library
+    index = FingerprintIndex(SR)
+    for i, samples in enumerate(sources):
+        index.add(f"src{i}", samples)
+    calls = []
+
+    def load(source_id):
+        calls.append(source_id)
+        return sources[source_id]
+
+    pattern, offsets = truths[1]
+    matches = index.search(pattern, top=10, load=load)
+    assert sorted(round(start * SR) for name, start, *_ in matches if name == "src1") == offsets
+    assert len(calls) == len(set(calls))
+
+def test_search_reads_windows_from_the_cache(library, tmp_path, monkeypatch):
+    sources, truths = library
+    cache = AudioCache(str(tmp_path / "cache"))
+    index = FingerprintIndex(SR)
+    for i, samples in enumerate(sources):
+        path = tmp_path / f"src{i}.wav"
+        path.write_bytes(f"source {i}".encode())  # stands in for the encoded file
+        cache.load(str(path), SR, "ffmpeg", lambda samples=samples: samples)
+        index.add(f"src{i}", samples, path=str(path))
+
+    def no_decode(*args, **kwargs):
+        raise AssertionError("a cached source was decoded")
+    monkeypatch.setattr(decode, "ffmpeg_decode", no_decode)
+
+    pattern, offsets = truths[2]
+    matches = index.search(pattern, top=10, cache=cache)
+    assert sorted(round(start * SR) for name, start, *_ in matches if name == "src2") == offsets
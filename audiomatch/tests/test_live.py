@@ -0,0 +1,47 @@
+import numpy as np
+
+from audiomatch.live import CANDIDATE, CONFIRMED, WITHDRAWN, LiveDetector
+from audiomatch.stream import stream_matches
+
+SR = 1000
+
+def planted(rng, pattern, n, starts, noise):
+    """Noise of n samples with pattern added at each start (its own noise level)."""
+    signal = 0.3 * rng.standard_normal(n).astype(np.float32)
+    for start, level in zip(starts, noise):
+        signal[start : start + len(pattern)] = pattern + level * rng.standard_normal(len(pattern))
+    return signal
+
+def feed(detector, signal, rng):
+    events, i = [], 0
+    while i < len(signal):
+        k = int(rng.integers(1, 300))
+        events += [(i + k, event) for event in detector.push(signal[i : i + k])]
+        i += k
+    return events + [(len(signal), event) for event in detector.flush()]
+
+def test_candidates_early_and_confirmed_like_batch():
+    rng = np.random.default_rng(3)
+    pattern = rng.standard_normal(400).astype(np.float32)
+    # Pairs of plants closer than the peak distance (800): the later, cleaner one must replace the first
+    signal = planted(rng, pattern, 20000, [2000, 2600, 9000, 15000, 15500],
+                     [0.6, 0.1, 0.2, 0.8, 0.05])
+    detector = LiveDetector(pattern, SR, height=0.5, distance_factor=2, block_size=256)
+    buffer = detector._buffer
+    events = feed(detector, signal, rng)
+    assert detector._buffer is buffer
+
+    confirmed = [event for _, event in events if event.status == CONFIRMED]
+    expected = list(stream_matches(pattern, [signal], SR, height=0.5, distance=800))
+    assert [e.start for e in confirmed] == [start for start, _, _, _ in expected]
+    assert np.allclose([(e.similarity, e.rms) for e in confirmed], [(sim, rms) for _, _, sim, rms in expected])
+
+    withdrawn = {event.start for _, event in events if event.status == WITHDRAWN}
+    assert withdrawn and not withdrawn & {event.start for event in confirmed}
+    candidates = [(received, event) for received, event in events if event.status == CANDIDATE]
+    assert {event.start for _, event in candidates} == withdrawn | {event.start for event in confirmed}
+    for received, event in candidates:
+        # Reported within one block + M of the match start (+1 sample: the peak's right neighbour)
+        detected = round(event.detected_at * SR)
+        assert detected <= received
+        assert detected - round(event.start * SR) <= detector.block_size + detector.m + 1
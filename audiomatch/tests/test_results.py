@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from audiomatch.__main__ import main
+from audiomatch.bench import make_workload
+from audiomatch.matcher import Matcher
+from audiomatch.results import ResultStore, incremental_search
+
+SR = 4000
+
+def offsets_and_rms(matches):
+    return [(round(start * SR), round(rms, 6)) for start, _, _, rms in matches]
+
+def records_offsets_and_rms(records):
+    return [(r["offset"], round(r["rms"], 6)) for r in records]
+
+@pytest.mark.parametrize("normalize", [True, False])
+def test_growing_source_matches_full_search(tmp_path, normalize):
+    pattern, search, _ = make_workload(duration=120, seed=11)
+    search[-1000:] *= 5  # the grown tail holds the new peak
+    matcher = Matcher(pattern, SR, normalize=normalize)
+    store = ResultStore(str(tmp_path / "results.jsonl"))
+    for cut in (len(search) // 3, len(search) // 2, len(search)):
+        records = incremental_search(store, matcher, str(tmp_path / "source"), search[:cut])
+    assert records_offsets_and_rms(records) == offsets_and_rms(matcher.search(search))
+
+@pytest.mark.parametrize("flag", [["--stretch", "0.1"], ["--skip-silence"], ["--workers", "2"], ["--low-memory"]])
+def test_results_rejects_ignored_flags(flag):
+    with pytest.raises(SystemExit):
+        main(["pattern.wav", "source.wav", "--results", "results.jsonl"] + flag)
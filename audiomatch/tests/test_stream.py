@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from audiomatch.peaks import select_by_distance
+from audiomatch.stream import StreamingPeakPicker
+
+def stream_peaks(x, height, distance, splits):
+    """Indices settled by a StreamingPeakPicker fed x in pieces cut at splits."""
+    picker = StreamingPeakPicker(height, distance)
+    found, start = [], 0
+    for end in list(splits) + [len(x)]:
+        found += picker.push(start, x[start:end])
+        start = end
+    found += picker.flush()
+    return [index for index, _, _ in found]
+
+def has_tie(x, peaks, distance):
+    """Whether two candidate peaks closer than distance have the same height."""
+    gap = np.ceil(distance)
+    return any(x[peaks[i]] == x[peaks[j]]
+               for i in range(len(peaks)) for j in range(i + 1, len(peaks)) if peaks[j] - peaks[i] < gap)
+
+def plateau_heavy(rng, n, clipped):
+    """Random walk scaled to [0, 1], then clipped at 1.0 or quantized, so flat runs are common."""
+    x = np.cumsum(rng.standard_normal(n))
+    x = (x - x.min()) / (np.ptp(x) + 1e-9)
+    x = np.minimum(x * rng.uniform(1, 2), 1.0) if clipped else np.round(x * rng.integers(2, 8)) / 4
+    return x.astype(np.float32)
+
+def test_plateau_across_block_edge():
+    x = np.array([0, 0.5, 0.5, 0.75, 0.75, 0.75, 0.25], dtype=np.float32)
+    expected = list(find_peaks(x, height=0.5, distance=3)[0])
+    assert expected == [4]
+    for split in range(1, len(x)):
+        assert stream_peaks(x, 0.5, 3, [split]) == expected
+
+@pytest.mark.parametrize("clipped", [False, True])
+def test_split_pushes_match_find_peaks(clipped):
+    rng = np.random.default_rng(1 + clipped)
+    for _ in range(1000):
+        n = int(rng.integers(3, 400))
+        x = plateau_heavy(rng, n, clipped)
+        height, distance = rng.uniform(0, 0.9), rng.uniform(1, 30)
+        splits = np.sort(rng.choice(np.arange(1, n), size=min(n - 1, int(rng.integers(0, 10))), replace=False))
+        got = stream_peaks(x, height, distance, splits)
+
+        candidates, _ = find_peaks(x, height=height)
+        assert got == list(candidates[select_by_distance(candidates, x[candidates], distance)])
+        if not has_tie(x, candidates, distance):  # find_peaks' own tie order is not stable
+            assert got == list(find_peaks(x, height=height, distance=distance)[0])
+
+def test_select_by_distance_matches_find_peaks():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        x = rng.random(int(rng.integers(3, 2000)))
+        distance = rng.uniform(1, 50)
+        candidates, _ = find_peaks(x)
+        kept = candidates[select_by_distance(candidates, x[candidates], distance)]
+        assert list(kept) == list(find_peaks(x, distance=distance)[0])
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from audiomatch.batch import search_patterns
+from audiomatch.bench import speech_like
+from audiomatch.ncc import normalized_cross_correlation
+from audiomatch.peaks import select_by_distance
+from audiomatch.stretch import scaled_variants, stretch_search
+
+SR = 4000
+PLANTED = {0.9: 3, 1.0: 12, 1.1: 21}  # scale -> start (seconds) of a planted copy
+
+@pytest.fixture(scope="module")
+def workload():
+    """A 0.5 s pattern planted at three speeds in 30 s of quantized speech-like noise."""
+    rng = np.random.default_rng(3)
+    pattern = speech_like(rng, SR // 2, SR)
+    search = 0.5 * speech_like(rng, 30 * SR, SR)
+    for scale, seconds in PLANTED.items():
+        variant = scaled_variants(pattern, (scale,))[scale]
+        search[seconds * SR + 123 : seconds * SR + 123 + len(variant)] = variant
+    return pattern, (np.round(search * 16) / 16).astype(np.float32)
+
+@pytest.mark.parametrize("height", [0.3, 0.7])
+def test_blocked_variant_search_matches_full_ncc(workload, height):
+    # The pattern bank is scored block by block (blocks of ~4 patterns): every peak
+    # of the full-signal NCC must come out, including those next to block edges.
+    pattern, search = workload
+    variants = scaled_variants(pattern)
+    found = search_patterns(variants, search, SR, height=height)
+    for scale, variant in variants.items():
+        ncc = normalized_cross_correlation(search, variant)
+        candidates, _ = find_peaks(ncc, height=height)
+        expected = candidates[select_by_distance(candidates, ncc[candidates], max(1, 0.25 * len(variant)))]
+        assert [round(start * SR) for start, _, _, _ in found[scale]] == list(expected)
+
+def test_stretch_search_reports_planted_scales(workload):
+    pattern, search = workload
+    matches = stretch_search(pattern, search, SR)
+    assert [(round(start * SR), scale) for start, _, _, _, scale in matches] == \
+        [(seconds * SR + 123, scale) for scale, seconds in PLANTED.items()]
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from audiomatch.__main__ import main
+from audiomatch.bench import speech_like
+from audiomatch.matcher import Matcher
+from audiomatch.vad import pruned_search
+
+SR = 4000
+OFFSETS = (40000, 200000)
+
+def quiet_speech_with_copies(rng, pattern, amplitude=0.01):
+    search = speech_like(rng, 60 * SR, SR)
+    for offset in OFFSETS:
+        search[offset : offset + len(pattern)] = pattern
+    return (amplitude * search / np.abs(search).max()).astype(np.float32)
+
+def starts(matches):
+    return [round(start * SR) for start, *_ in matches]
+
+def test_transient_does_not_silence_the_signal():
+    rng = np.random.default_rng(0)
+    pattern = speech_like(rng, 2 * SR, SR)
+    search = quiet_speech_with_copies(rng, pattern)
+    search[100000:100080] = 3.0  # one click, 50 dB above the speech
+    matcher = Matcher(pattern, SR)
+    pruned, stats = pruned_search(matcher, search)
+    assert starts(pruned) == starts(matcher.search(search)) == list(OFFSETS)
+    assert stats["skipped_fraction"] < 0.5
+
+def test_pruning_keeps_every_match():
+    rng = np.random.default_rng(1)
+    pattern = speech_like(rng, 2 * SR, SR)
+    pattern[3000:4000] = 0  # a pause inside the pattern
+    search = quiet_speech_with_copies(rng, pattern)
+    search[120000:199000] *= 1e-3  # long near-silent stretches around the copies
+    search[210000:] *= 1e-3
+    search[150000:150040] = 2.0
+    matcher = Matcher(pattern, SR)
+    pruned, stats = pruned_search(matcher, search)
+    assert starts(pruned) == starts(matcher.search(search)) == list(OFFSETS)
+    assert stats["skipped_fraction"] > 0.3
+
+@pytest.mark.parametrize("flag", [["--stretch", "0.1"], ["--workers", "2"], ["--workers", "0"], ["--low-memory"]])
+def test_skip_silence_rejects_ignored_flags(flag):
+    with pytest.raises(SystemExit):
+        main(["pattern.wav", "source.wav", "--skip-silence"] + flag)
@@ -0,0 +1,121 @@
+"""
+Silence pruning: a voice-activity pre-pass that restricts the NCC to the parts
+of the search signal where something is audible.
+
+Frames whose energy (from the block-anchored prefix sums the NCC statistics use)
+is more than threshold_db below the reference level are silent. The reference
+is a high percentile of the frame energies rather than the loudest frame, so a
+click or other transient shorter than 1 - REFERENCE_PERCENTILE of the signal
+cannot raise it and mark ordinary content as silence; a mostly silent signal
+gets a lower reference, which only prunes less.
+Content more than threshold_db below the reference counts as silence even where
+it would match (the NCC ignores level); lower threshold_db to search it too. Silent gaps that a
+match could span are bridged (up to the longest silence inside the pattern, so a
+pattern with pauses still lines up), regions are widened by the pattern's leading
+and trailing silence, and only regions at least one pattern long are correlated.
+Skipped offsets score 0, so peak picking is unchanged on the searched ones.
+"""
+import numpy as np
+
+from .stats import BlockedPrefixSums
+
+FRAME_SECONDS = 0.02  # energy frame length
+THRESHOLD_DB = -40.0  # silent: frame energy this far below the reference level
+REFERENCE_PERCENTILE = 95.0  # reference level: this percentile of the frame energies
+HANGOVER_FRAMES = 2   # tolerance (frames) on each side of an active region
+
+def frame_energy(x, frame, prefix=None):
+    """Mean square of x in consecutive frames of `frame` samples (the last one may be shorter)."""
+    n = len(x)
+    if n == 0:
+        return np.zeros(0)
+    if prefix is None:
+        prefix = BlockedPrefixSums(x)
+    lo = np.arange(0, n, frame)
+    hi = np.minimum(lo + frame, n)
+    _, sums_sq = prefix.range_sums(lo, hi)
+    return sums_sq / (hi - lo)
+
+def activity_mask(x, sr, frame_seconds=FRAME_SECONDS, threshold_db=THRESHOLD_DB, prefix=None):
+    """(active flag per frame, frame length in samples); all False for a silent signal."""
+    frame = max(1, int(round(frame_seconds * sr)))
+    energy = frame_energy(x, frame, prefix)
+    if not len(energy) or energy.max() <= 0:
+        return np.zeros(len(energy), dtype=bool), frame
+    reference = np.percentile(energy, REFERENCE_PERCENTILE)
+    return energy > reference * 10 ** (threshold_db / 10), frame
+
+def _runs(mask):
+    """(start, end) frame indices of the runs of True in mask."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    return edges.reshape(-1, 2)
+
+def pattern_silences(pattern, sr, frame_seconds=FRAME_SECONDS, threshold_db=THRESHOLD_DB):
+    """(leading, longest inner, trailing) silence of the pattern, in samples."""
+    mask, frame = activity_mask(pattern, sr, frame_seconds, threshold_db)
+    runs = _runs(mask)
+    if not len(runs):
+        return len(pattern), len(pattern), len(pattern)
+    inner = int((runs[1:, 0] - runs[:-1, 1]).max()) * frame if len(runs) > 1 else 0
+    return int(runs[0, 0]) * frame, inner, max(0, len(pattern) - int(runs[-1, 1]) * frame)
+
+def active_regions(x, sr, min_length=1, max_gap=0, pad=(0, 0), frame_seconds=FRAME_SECONDS,
+                   threshold_db=THRESHOLD_DB, prefix=None):
+    """
+    Sample ranges [(lo, hi), ...] of x to search: active frames widened by
+    HANGOVER_FRAMES, joined across silent gaps of at most max_gap samples, extended
+    by pad = (before, after) samples and kept when at least min_length long.
+    """
+    n = len(x)
+    mask, frame = activity_mask(x, sr, frame_seconds, threshold_db, prefix)
+    runs = _runs(mask) * frame
+    if not len(runs):
+        return np.zeros((0, 2), dtype=np.int64)
+    tolerance = HANGOVER_FRAMES * frame
+    lo = np.maximum(0, runs[:, 0] - tolerance - pad[0])
+    hi = np.minimum(n, runs[:, 1] + tolerance + pad[1])
+    # Join regions whose gap a match could span (or that now overlap)
+    joined = np.concatenate(([True], lo[1:] - hi[:-1] > max_gap))
+    first = np.flatnonzero(joined)
+    last = np.concatenate((first[1:] - 1, [len(lo) - 1]))
+    regions = np.column_stack((lo[first], hi[last]))
+    return regions[regions[:, 1] - regions[:, 0] >= min_length]
+
+def pruned_search(matcher, search, frame_seconds=FRAME_SECONDS, threshold_db=THRESHOLD_DB):
+    """
+    Matcher search restricted to the active regions of search.
+    Returns (matches, stats): matches as Matcher.search gives them, stats with the
+    searched and skipped durations and the skipped spans [(start_s, end_s), ...].
+    """
+    samples = matcher.prepare(search)
+    m, n, sr = matcher.m, len(samples), matcher.sr
+    lead, inner, trail = pattern_silences(matcher.pattern_centered, sr, frame_seconds, threshold_db)
+    frame = max(1, int(round(frame_seconds * sr)))
+    regions = active_regions(samples, sr, min_length=m, max_gap=inner + 2 * frame, pad=(lead, trail),
+                             frame_seconds=frame_seconds, threshold_db=threshold_db)
+
+    matches = []
+    if matcher.pattern_std >= 1e-9:  # silent/constant pattern: no matches possible
+        if len(regions) == 1 and regions[0, 1] - regions[0, 0] == n:  # nothing to skip
+            matches = matcher.pick(*matcher.ncc(samples))
+        elif len(regions):
+            n_out = n - m + 1
+            ncc = np.zeros(n_out, dtype=np.float32)
+            sums_sq = np.zeros(n_out)
+            for lo, hi in regions:
+                count = hi - lo - m + 1
+                ncc[lo : lo + count], sums_sq[lo : lo + count] = matcher.ncc(samples, lo, count,
+                                                                             nfft=matcher.fft_size(hi - lo))
+            matches = matcher.pick(ncc, sums_sq)
+
+    bounds = np.concatenate(([0], regions.ravel(), [n]))
+    skipped = [(int(lo) / sr, int(hi) / sr) for lo, hi in bounds.reshape(-1, 2) if hi > lo]
+    searched = int((regions[:, 1] - regions[:, 0]).sum())
+    stats = {
+        "regions": len(regions),
+        "searched_seconds": searched / sr,
+        "skipped_seconds": (n - searched) / sr,
+        "skipped_fraction": (n - searched) / n if n else 0.0,
+        "skipped": skipped,
+    }
+    return matches, stats
@@ -0,0 +1,31 @@
+import librosa
+import time
+from audiomatch import SearchSignal, read_audio, search_patterns
+
+# Many marker clips against one transcript: the search file is decoded once and its
+# block spectra / window statistics are shared by every pattern.
+
+# File paths and target sampling rate
+pattern_paths = {
+    "ABCDE": r"/home/user/test/ABCDE.mp3",
+    "jingle": r"/home/user/test/jingle.mp3",
+}
+search_path = r"/home/user/test/transcript.mp3"
+target_sr = 4000  # 4 kHz
+
+print("Loading audio...")
+t_start_load = time.time()
+# Normalize audio to have max amplitude of 1, as fftconvol-with-soundfile.py does,
+# so the reported RMS values are on the same scale.
+patterns = {name: librosa.util.normalize(read_audio(path, target_sr)) for name, path in pattern_paths.items()}
+search = SearchSignal(librosa.util.normalize(read_audio(search_path, target_sr)))
+print(f"Audio loaded and preprocessed in {time.time() - t_start_load:.2f}s")
+
+t_search = time.time()
+table = search_patterns(patterns, search, target_sr, height=0.7, distance_factor=0.25)
+print(f"Searched {len(patterns)} patterns in {time.time() - t_search:.2f}s")
+
+for name, matches in table.items():
+    print(f"\nPattern '{name}': {len(matches)} match(es)")
+    for i, (start, end, sim, rms_val) in enumerate(matches):
+        print(f"  Match {i+1}: Start = {start:.2f}s, End = {end:.2f}s, Sim = {sim:.2f}, RMS = {rms_val:.4f}")
@@ -0,0 +1,31 @@
+import time
+from audiomatch import iter_audio_blocks, read_audio, stream_matches
+
+# Streaming variant of fftconvol-with-soundfile.py: the search file is read in
+# blocks (soundfile.blocks or an ffmpeg pipe) and correlated overlap-save style,
+# so memory stays bounded no matter how long the search audio is.
+# RMS is reported on the un-normalized search signal (the global peak is unknown
+# until the stream ends); NCC itself is unaffected by the normalization.
+
+# File paths and target sampling rate
+pattern_path = r"/home/user/test/ABCDE.mp3"
+search_path = r"/home/user/test/transcript.mp3"
+target_sr = 4000  # 4 kHz
+block_size = 1 << 16  # search samples read per block
+
+print("Loading pattern...")
+pattern = read_audio(pattern_path, target_sr)
+if len(pattern) == 0:
+    raise ValueError("Pattern is empty. Cannot perform matching.")
+
+print("Streaming search audio...")
+t_start = time.time()
+n_matches = 0
+for start, end, sim, rms_val in stream_matches(pattern, iter_audio_blocks(search_path, target_sr, block_size),
+                                               target_sr, height=0.7, distance=max(1, 0.25 * len(pattern))):
+    n_matches += 1
+    print(f"Match {n_matches}: Start = {start:.2f}s, End = {end:.2f}s, Sim = {sim:.2f}, RMS = {rms_val:.4f}")
+
+print(f"Streaming search took {time.time() - t_start:.2f}s")
+if n_matches == 0:
+    print("No matches found.")
@@ -3,6 +3,7 @@ import resampy
 import numpy as np
 from scipy.signal import fftconvolve, find_peaks
 import matplotlib.pyplot as plt
+from audiomatch import default_cache, match_features
 
 # Define audio paths as provided
 pattern_path = r"F:\STR\output1.ogg"
@@ -12,16 +13,17 @@ search_path = r"F:\STR\output2.ogg"
 target_sr = 8000  # 8 kHz (note: comment saying 11.025 kHz seems to be a typo)
 
 # Load audio files with soundfile
-pattern, sr_pattern = sf.read(pattern_path)
-if pattern.ndim > 1:
-    pattern = np.mean(pattern, axis=1)
-pattern = resampy.resample(pattern, sr_pattern, target_sr)
+def load_resampled(path):
+    data, sr_native = sf.read(path)
+    if data.ndim > 1:
+        data = np.mean(data, axis=1)
+    return resampy.resample(data, sr_native, target_sr)
+
+# Decoded/resampled once, then served from the on-disk cache
+pattern = default_cache().load(pattern_path, target_sr, "resampy", lambda: load_resampled(pattern_path))
 pattern = pattern / np.max(np.abs(pattern))
 
-search, sr_search = sf.read(search_path)
-if search.ndim > 1:
-    search = np.mean(search, axis=1)
-search = resampy.resample(search, sr_search, target_sr)
+search = default_cache().load(search_path, target_sr, "resampy", lambda: load_resampled(search_path))
 search = search / np.max(np.abs(search))
 
 # Set sampling rate to target after resampling
@@ -49,31 +51,11 @@ else:
     # Calculate pattern duration in seconds
     pattern_duration = len(pattern) / sr
 
-    # Store match details with RMS amplitude
-    matches = []
-    for peak in peaks:
-        start_time = peak / sr
-        end_time = start_time + pattern_duration
-        similarity = correlation_normalized[peak]
-
-        # Compute RMS amplitude of the matched segment, interval near end, 0.2% length
-        original_end_sample = int(peak + len(pattern))
-        interval_length = int(0.2 * len(pattern))  # 0.2% of pattern length
-        start_sample = original_end_sample - interval_length
-        end_sample = original_end_sample
-
-        if start_sample < 0:
-            start_sample = 0
-        if end_sample > len(search):
-            end_sample = len(search)
-        if start_sample >= end_sample:  # Handle edge case where interval is invalid
-            start_sample = original_end_sample - 1 if original_end_sample > 0 else 0
-            end_sample = original_end_sample
-
-        segment = search[start_sample:end_sample]
-        rms = np.sqrt(np.mean(segment**2))  # RMS calculation
-
-        matches.append((start_time, end_time, similarity, rms))
+    # Store match details with RMS amplitude of the interval near the end (last 20% of the
+    # pattern length, at least one sample), computed for all peaks in one vectorized pass
+    features = match_features(search, peaks, len(pattern), tail_fraction=0.2)
+    matches = [(peak / sr, peak / sr + pattern_duration, correlation_normalized[peak], rms)
+               for peak, rms in zip(peaks, features["tail_rms"])]
 
     # Sort matches by similarity (highest first)
     matches.sort(key=lambda x: x[2], reverse=True)
@@ -1,5 +1,6 @@
-import numpy as np, subprocess
+import numpy as np
 from scipy.signal import spectrogram, find_peaks
+from audiomatch import decode_many, default_cache, spectrogram_match
 
 PAT, SRC, SR, TH = (
     r"C:\Users\My computer.DESKTOP-I6I43CB\Desktop\Fulo\output_1.ogg",
@@ -12,23 +13,7 @@ PAT, SRC, SR, TH = (
 NPERSEG = 1024
 NOVERLAP = 512
 
-def get(f):
-    cmd = [
-        "ffmpeg",
-        "-i",
-        f,
-        "-f",
-        "f32le",
-        "-ac",
-        "1",
-        "-ar",
-        str(SR),
-        "-v",
-        "0",
-        "pipe:1",
-    ]
-    y = np.frombuffer(subprocess.run(cmd, capture_output=True).stdout, dtype=np.float32)
-    
+def spec(y):
     # 2. Use the global parameters here
     return (
         (np.log10(spectrogram(y, fs=SR, nperseg=NPERSEG, noverlap=NOVERLAP)[2] + 1e-10), len(y))
@@ -36,19 +21,14 @@ def get(f):
         else (None, 0)
     )
 
-(pat, _), (src, slen) = get(PAT), get(SRC)
+# Both files decode in parallel (ffmpeg pool), straight into NumPy buffers
+(pat, _), (src, slen) = map(spec, decode_many([PAT, SRC], SR, cache=default_cache()))
 if pat is None or src is None:
     exit("Error: Invalid files")
 
-p = pat.flatten() - pat.mean()
-pn, w, sc = np.linalg.norm(p), pat.shape[1], []
-
-for i in range(src.shape[1] - w):
-    v = src[:, i : i + w].flatten()
-    v -= v.mean()
-    sc.append(np.dot(v, p) / (np.linalg.norm(v) * pn + 1e-10))
-
-sc = np.array(sc)
+# All frame offsets in one batched FFT pass (same scores as the per-offset loop)
+w = pat.shape[1]
+sc = spectrogram_match(pat, src)
 if (rng := np.ptp(sc)) > 0:
     sc = (sc - sc.min()) / rng
 
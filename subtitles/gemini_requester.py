@@ -1,11 +1,10 @@
 import os
 import logging
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
 
 # Import the processor from the other file
 from keypair_processor import KeyPairProcessor 
+from stream_clients import GeminiStreamClient
 
 # --- Configuration for Gemini API ---
 GEMINI_MODEL_NAME = "gemini-2.5-flash-preview-05-20" # Corrected name if preview-05-20 is valid
@@ -14,13 +13,17 @@ class GeminiStreamer:
     """
     Handles making requests to the Gemini API and streaming the response
     to a KeyPairProcessor.
+    Pass `client` (anything with `stream(prompt)`, e.g. stream_clients.ReplayClient)
+    to stream from somewhere other than the API; api_key is then unused.
     """
-    def __init__(self, api_key, output_filename_base):
+    def __init__(self, api_key, output_filename_base, client=None):
         self.api_key = api_key
         self.output_filename_base = output_filename_base
-        self.client = None
+        self.client = client
+        if self.client is not None:
+            return
         try:
-            self.client = genai.Client(api_key=self.api_key)
+            self.client = GeminiStreamClient(api_key=self.api_key, model_name=GEMINI_MODEL_NAME)
         except Exception as e:
             logging.error(f"Error initializing Google GenAI Client: {e}")
             raise # Reraise to stop execution if client fails
@@ -33,35 +36,13 @@ class GeminiStreamer:
             logging.error("Gemini client not initialized. Cannot stream.")
             return
 
-        gen_config = types.GenerateContentConfig(
-            temperature=1.5, top_p=0.5, candidate_count=1, max_output_tokens=65000,
-            thinking_config=types.ThinkingConfig(thinking_budget=500),
-            response_mime_type="text/plain",
-            system_instruction=[types.Part.from_text(text="Translate to Vietnamese. Keep `(` and `)`. Output as JSON.")]
-        )
-        gen_contents = [types.Content(role="user", parts=[types.Part.from_text(text=input_text_for_llm)])]
-
         logging.info(f"Starting content generation for input (first 50 chars): '{input_text_for_llm[:50]}...'")
         raw_stream_output_file = f"{self.output_filename_base}_raw_stream.txt"
         logging.info(f"Full AI stream will be saved to '{raw_stream_output_file}'")
 
         try:
             with open(raw_stream_output_file, "w", encoding="utf-8") as f_stream:
-                stream = self.client.generate_content(
-                    model=f"models/{GEMINI_MODEL_NAME}",
-                    contents=gen_contents,
-                    generation_config=gen_config,
-                    stream=True
-                )
-
-                chunk_num = 0
-                for chunk in stream:
-                    chunk_num += 1
-                    if not hasattr(chunk, 'text') or not chunk.text:
-                        logging.debug(f"Chunk {chunk_num} has no text, skipping.")
-                        continue
-                    
-                    chunk_text = chunk.text
+                for chunk_text in self.client.stream(input_text_for_llm):
                     f_stream.write(chunk_text) # Save raw chunk
                     f_stream.flush() # Ensure it's written immediately for monitoring
 
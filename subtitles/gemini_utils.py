@@ -2,9 +2,8 @@ import os
 import re
 import io # For StringIO
 import logging # For logging
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
+from stream_clients import GeminiStreamClient, default_generation_config
 
 # --- Global Configuration (Easier to find and modify) ---
 # These were previously hardcoded or passed around less explicitly
@@ -184,28 +183,26 @@ def save_pair_data_to_file(segments_dict, p1_key, p2_key, output_directory):
 
 
 # --- Main Simplified Function ---
-def generate_and_save_simplified(input_text_for_llm, output_filename_base, gemini_api_key):
+def generate_and_save_simplified(input_text_for_llm, output_filename_base, gemini_api_key, client=None):
     """
     Generates content using Gemini, processes it in chunks to find key pairs,
     checks surrounding content, and saves qualified pairs.
+    `client` (anything with `stream(prompt)`, e.g. stream_clients.ReplayClient)
+    replaces the Gemini API, in which case gemini_api_key is not needed.
     """
-    if not gemini_api_key:
-        logging.error("GEMINI_API_KEY not provided.")
-        return
+    if client is None:
+        if not gemini_api_key:
+            logging.error("GEMINI_API_KEY not provided.")
+            return
 
-    try:
-        client = genai.Client(api_key=gemini_api_key)
-    except Exception as e:
-        logging.error(f"Error initializing Google GenAI Client: {e}")
-        return
-
-    gen_config = types.GenerateContentConfig(
-        temperature=1.6, top_p=0.3, candidate_count=1, max_output_tokens=65000,
-        thinking_config=types.ThinkingConfig(thinking_budget=500), # Corrected parameter name
-        response_mime_type="text/plain",
-        system_instruction=[types.Part.from_text(text="Translate to Vietnamese. Keep `(` and `)`. Output as JSON.")]
-    )
-    gen_contents = [types.Content(role="user", parts=[types.Part.from_text(text=input_text_for_llm)])]
+        try:
+            client = GeminiStreamClient(
+                api_key=gemini_api_key, model_name=GEMINI_MODEL_NAME,
+                generation_config=default_generation_config(temperature=1.6, top_p=0.3)
+            )
+        except Exception as e:
+            logging.error(f"Error initializing Google GenAI Client: {e}")
+            return
 
     logging.info(f"Starting content generation for input (first 50 chars): '{input_text_for_llm[:50]}...'")
     stream_output_file = f"{output_filename_base}_stream_simplified.txt"
@@ -229,19 +226,7 @@ def generate_and_save_simplified(input_text_for_llm, output_filename_base, gemin
 
     try:
         with open(stream_output_file, "w", encoding="utf-8") as f_stream:
-            # Updated API call according to recent google-generativeai versions
-            stream = client.models.generate_content_stream(
-                model=f"models/{GEMINI_MODEL_NAME}", # Model path usually includes "models/"
-                contents=gen_contents,
-                config=gen_config
-            )
-
-            for chunk_num, chunk in enumerate(stream):
-                if not hasattr(chunk, 'text') or not chunk.text:
-                    logging.debug(f"Chunk {chunk_num+1} has no text, skipping.")
-                    continue
-
-                chunk_text = chunk.text
+            for chunk_num, chunk_text in enumerate(client.stream(input_text_for_llm)):
                 f_stream.write(chunk_text) # Save raw chunk
                 cumulative_text_buffer.write(chunk_text)
                 current_total_text_length += len(chunk_text)
@@ -419,10 +404,9 @@ if __name__ == "__main__":
     # You would replace this with actual meaningful input.
     test_input_for_llm = """TXT"""
 
-    # If you want to test with a pre-generated text file instead of calling the API:
-    # You would need to modify the generate_and_save_simplified function to accept
-    # text directly or read from a file, bypassing the API call.
-    # For now, it's set up to call the API.
+    # To replay a pre-generated stream instead of calling the API, pass e.g.
+    # client=ReplayClient.from_file("generated_output_simplified_stream_simplified.txt")
+    # (from stream_clients).
 
     generate_and_save_simplified(test_input_for_llm, "generated_output_simplified", api_key)
 
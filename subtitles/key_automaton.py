@@ -0,0 +1,90 @@
+from typing import Dict, Iterable, List, Tuple
+import bisect
+import logging
+
+logger = logging.getLogger(__name__)
+
+class KeyAutomaton:
+    """
+    Aho-Corasick automaton over a fixed set of keys, fed a text stream chunk by chunk.
+    The matching state carries over between chunks, so every occurrence of every key
+    (overlapping ones included, and ones that straddle a chunk boundary) is reported
+    exactly once, when its last character arrives. Each streamed character costs one
+    transition, however many keys there are.
+    """
+    def __init__(self, keys: Iterable[str]):
+        self.keys: List[str] = sorted({key for key in keys if key})
+        self.occurrences: Dict[str, List[int]] = {key: [] for key in self.keys}
+        self.text_length = 0
+        self._state = 0
+
+        # Trie: goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._outputs: List[Tuple[str, ...]] = [()]
+        for key in self.keys:
+            state = 0
+            for char in key:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._outputs.append(())
+                state = next_state
+            self._outputs[state] += (key,)
+
+        # Failure links in breadth-first order; outputs inherit those of their failure state
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._outputs[next_state] += self._outputs[self._fail[next_state]]
+                queue.append(next_state)
+        logger.debug(f"Key automaton: {len(self.keys)} keys, {len(self._goto)} states.")
+
+    def feed(self, chunk_text: str) -> List[Tuple[int, str]]:
+        """
+        Advances the automaton over the next chunk of the stream.
+
+        Args:
+            chunk_text: Text that follows everything fed so far.
+
+        Returns:
+            (start index in the whole stream, key) for each occurrence completed by this chunk,
+            in order of their end positions.
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = self._state
+        found: List[Tuple[int, str]] = []
+        end = self.text_length
+        for char in chunk_text:
+            end += 1
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for key in outputs[state]:
+                found.append((end - len(key), key))
+        for start, key in found:
+            self.occurrences[key].append(start)
+        self._state = state
+        self.text_length = end
+        return found
+
+    def find(self, key: str, start: int = 0) -> int:
+        """
+        Same as full_text.find(key, start) on the text fed so far, from the recorded occurrences.
+
+        Args:
+            key: One of the automaton's keys.
+            start: First allowed start index.
+
+        Returns:
+            The lowest start index >= start, or -1.
+        """
+        positions = self.occurrences[key]
+        i = bisect.bisect_left(positions, start)
+        return positions[i] if i < len(positions) else -1
@@ -1,48 +1,49 @@
 import os
 import re
-import io
+import bisect
+import heapq
 import logging
 
+from key_automaton import KeyAutomaton
+from nonws_index import NonWhitespaceIndex
+
 # --- Configuration for KeyPair Processing ---
 REQUIRED_NON_WHITESPACE_AROUND_KEYS = 150
 OFFSET_CHARS_FOR_NEXT_P1_SEARCH = 250  # Constraint 1
 
-# --- Core Helper Functions (Utility, no class needed) ---
-def count_non_whitespace_threshold(text_source, start_idx, end_idx, threshold):
-    """
-    Checks if 'threshold' non-whitespace characters exist in text_source[start_idx:end_idx].
-    Returns (True, count_at_stop_or_total)
-    """
-    count = 0
-    effective_end_idx = min(end_idx, len(text_source))
-    for i in range(start_idx, effective_end_idx):
-        if not text_source[i].isspace():
-            count += 1
-        if count >= threshold:
-            return True, count
-    return False, count
-
-def extract_n_non_whitespace(text_source, n_chars_to_extract, from_start=True):
+class ChunkedText:
     """
-    Extracts a segment from text_source containing n_chars_to_extract non-whitespace characters.
+    Append-only text kept as the list of received chunks (no copy of the text so far
+    on each append). Only the ranges asked for are joined into strings.
     """
-    if not text_source or n_chars_to_extract <= 0: return ""
-    if from_start:
-        buffer = []; nw_count = 0
-        for char in text_source:
-            buffer.append(char)
-            if not char.isspace(): nw_count += 1
-            if nw_count == n_chars_to_extract: break
-        return "".join(buffer)
-    else: # from_end
-        nw_count = 0; start_idx_segment = len(text_source)
-        for i in range(len(text_source) - 1, -1, -1):
-            start_idx_segment = i
-            if not text_source[i].isspace(): nw_count += 1
-            if nw_count == n_chars_to_extract: break
-        if nw_count < n_chars_to_extract and nw_count > 0: start_idx_segment = 0
-        elif nw_count == 0: return ""
-        return text_source[start_idx_segment:]
+    def __init__(self):
+        self.chunks = []
+        self.chunk_starts = []  # offset of each chunk in the whole text
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, chunk_text):
+        if not chunk_text: return
+        self.chunks.append(chunk_text)
+        self.chunk_starts.append(self.length)
+        self.length += len(chunk_text)
+
+    def slice(self, start, end=None):
+        """Same as full_text[start:end] for 0 <= start, joining only the chunks that overlap it."""
+        end = self.length if end is None else min(end, self.length)
+        if start >= end: return ""
+        first = bisect.bisect_right(self.chunk_starts, start) - 1
+        last = bisect.bisect_right(self.chunk_starts, end - 1) - 1
+        if first == last:
+            offset = self.chunk_starts[first]
+            return self.chunks[first][start - offset : end - offset]
+        parts = [self.chunks[first][start - self.chunk_starts[first]:]]
+        parts.extend(self.chunks[first + 1 : last])
+        parts.append(self.chunks[last][: end - self.chunk_starts[last]])
+        return "".join(parts)
+
 
 class TargetPair:
     """
@@ -93,9 +94,12 @@ class TargetPair:
 class KeyPairProcessor:
     """
     Manages the state and logic for finding and processing target key pairs from text chunks.
+    on_qualified, if given, is called as on_qualified(p1_key, p2_key, segments) for each
+    pair written out (segments as in the pair's file: before, key1, between, key2, after).
     """
-    def __init__(self, target_pair_definitions, output_directory):
+    def __init__(self, target_pair_definitions, output_directory, on_qualified=None):
         self.output_directory = output_directory
+        self.on_qualified = on_qualified
         os.makedirs(self.output_directory, exist_ok=True)
 
         num_total_pairs = len(target_pair_definitions)
@@ -104,15 +108,30 @@ class KeyPairProcessor:
             for idx, (p1, p2) in enumerate(target_pair_definitions)
         ]
         
-        self.cumulative_text_buffer = io.StringIO()
+        # Every P1/P2 key is matched in one pass over the stream
+        self.key_automaton = KeyAutomaton(
+            key for pair in self.all_target_pairs for key in (pair.p1_key_text, pair.p2_key_text)
+        )
+        # Pairs each key can advance: as P1 (while unfound) or as P2 (once P1 is found)
+        self.pairs_by_p1_key = {}
+        self.pairs_by_p2_key = {}
+        for pair in self.all_target_pairs:
+            self.pairs_by_p1_key.setdefault(pair.p1_key_text, []).append(pair.original_list_index)
+            if pair.p2_key_text:
+                self.pairs_by_p2_key.setdefault(pair.p2_key_text, []).append(pair.original_list_index)
+        self.unfound_p1_indices = list(range(num_total_pairs))  # sorted; P1 not found, not skipped
+        self.seen_unfound_p1_indices = set()  # of those, pairs whose P1 occurred (before the search offset)
+        self.awaiting_content_indices = set()  # both keys found, content counts still short
+        self.cumulative_text_buffer = ChunkedText()
+        self.non_whitespace_index = NonWhitespaceIndex()
         self.current_total_text_length = 0
         self.global_p1_search_start_offset = 0
         self.deferred_final_pair_object = None
         self.processed_files_count = 0
 
 
-    def _extract_and_format_segments(self, pair_object, full_text_content):
-        """Extracts text segments for a qualified pair."""
+    def _extract_and_format_segments(self, pair_object, text_buffer):
+        """Extracts text segments for a qualified pair (joining only the ranges written out)."""
         segments = {
             'before': "", 'key1': pair_object.p1_key_text, 'between': "",
             'key2': pair_object.p2_key_text or "", 'after': ""
@@ -123,23 +142,23 @@ class KeyPairProcessor:
         p2_content_ends_idx = pair_object.p2_actual_content_end_index()
 
         if pair_object.requires_before_content_check:
-            segments['before'] = extract_n_non_whitespace(
-                full_text_content[0:p1_start_idx],
-                REQUIRED_NON_WHITESPACE_AROUND_KEYS, from_start=False
-            )
+            segments['before'] = text_buffer.slice(*self.non_whitespace_index.extract_bounds(
+                0, p1_start_idx, REQUIRED_NON_WHITESPACE_AROUND_KEYS, from_start=False
+            ))
         if pair_object.is_last_pair_with_empty_p2:
-            segments['between'] = full_text_content[p1_end_idx:]
+            segments['between'] = text_buffer.slice(p1_end_idx)
         else:
-            segments['between'] = full_text_content[p1_end_idx : p2_starts_idx]
+            segments['between'] = text_buffer.slice(p1_end_idx, p2_starts_idx)
         if pair_object.requires_after_content_check:
-            segments['after'] = extract_n_non_whitespace(
-                full_text_content[p2_content_ends_idx:],
-                REQUIRED_NON_WHITESPACE_AROUND_KEYS, from_start=True
-            )
+            segments['after'] = text_buffer.slice(*self.non_whitespace_index.extract_bounds(
+                p2_content_ends_idx, len(text_buffer), REQUIRED_NON_WHITESPACE_AROUND_KEYS, from_start=True
+            ))
         return segments
 
     def _save_pair_data_to_file(self, segments_dict, p1_key, p2_key):
         """Saves the extracted segments to a file."""
+        if self.on_qualified is not None:
+            self.on_qualified(p1_key, p2_key, segments_dict)
         pair_filename_p2_part = p2_key if p2_key else "end"
         safe_p1 = re.sub(r'[^\w_.)( -]', '', p1_key)
         safe_p2_part = re.sub(r'[^\w_.)( -]', '', pair_filename_p2_part)
@@ -161,106 +180,145 @@ class KeyPairProcessor:
             logging.error(f"Error writing file {full_output_path}: {e}")
 
     def process_chunk(self, chunk_text):
-        """Processes a new chunk of text to find and qualify pairs."""
+        """
+        Processes a new chunk of text to find and qualify pairs.
+        Keys are located by the automaton as the chunk streams in (each character
+        scanned once for all keys); the ordering and skip rules below then only look
+        up recorded occurrences, and content counts resume where the previous chunk
+        left them, so the work per chunk depends on the chunk, not on the text so far.
+        Only the pairs the chunk can advance are visited, in list order: those using a
+        key the chunk completed, those waiting for content, and (when the global P1
+        search offset moves) those whose P1 occurred before the old offset. Every
+        other pair would find nothing new, so the cost does not grow with the number of keys.
+        """
         if not chunk_text:
             return
 
-        self.cumulative_text_buffer.write(chunk_text)
+        text_buffer = self.cumulative_text_buffer
+        text_buffer.append(chunk_text)
+        completed_keys = {key for _, key in self.key_automaton.feed(chunk_text)}
+        self.non_whitespace_index.append(chunk_text)
         self.current_total_text_length += len(chunk_text)
-        full_text_so_far = self.cumulative_text_buffer.getvalue()
 
         logging.debug(f"--- Processing Chunk (New total length: {self.current_total_text_length}, "
                       f"Global P1 search from: {self.global_p1_search_start_offset}) ---")
 
-        for current_pair in self.all_target_pairs:
-            if current_pair.is_permanently_skipped or current_pair.is_fully_processed:
-                continue
-
-            # 1. Find P1 Key
-            if current_pair.p1_found_at_index == -1:
-                found_idx = full_text_so_far.find(current_pair.p1_key_text, self.global_p1_search_start_offset)
-                if found_idx != -1:
-                    current_pair.p1_found_at_index = found_idx
-                    logging.info(f"  Found P1='{current_pair.p1_key_text}' for pair {current_pair.original_list_index} "
-                                 f"at index {found_idx} (searched from {self.global_p1_search_start_offset}).")
-                    for prev_pair_scan_idx in range(current_pair.original_list_index):
-                        earlier_pair = self.all_target_pairs[prev_pair_scan_idx]
-                        if earlier_pair.p1_found_at_index == -1 and not earlier_pair.is_permanently_skipped:
-                            earlier_pair.is_permanently_skipped = True
-                            logging.info(f"    INFO: Pair {earlier_pair.original_list_index} "
-                                         f"('{earlier_pair.p1_key_text}') was not found before pair "
-                                         f"{current_pair.original_list_index}. Permanently skipping.")
-
-            # 2. Find P2 Key
-            if current_pair.p1_found_at_index != -1 and current_pair.p2_conceptual_end_index == -1:
-                search_p2_from = current_pair.p1_end_index()
-                if current_pair.p2_key_text:
-                    found_idx2 = full_text_so_far.find(current_pair.p2_key_text, search_p2_from)
-                    if found_idx2 != -1:
-                        current_pair.p2_conceptual_end_index = found_idx2
-                        logging.info(f"  Found P2='{current_pair.p2_key_text}' for pair {current_pair.original_list_index} "
-                                     f"at index {found_idx2}.")
-                        content_between_start = search_p2_from
-                        content_between_end = found_idx2
-                        length_between = content_between_end - content_between_start
-                        offset_in_between = max(0, length_between - OFFSET_CHARS_FOR_NEXT_P1_SEARCH)
-                        self.global_p1_search_start_offset = content_between_start + offset_in_between
-                        logging.info(f"    Updated global P1 search offset to: {self.global_p1_search_start_offset}.")
-                else: # P2 is empty
-                    current_pair.p2_conceptual_end_index = search_p2_from
-                    logging.info(f"  P2 is empty for pair {current_pair.original_list_index}, conceptual end at {search_p2_from}.")
-                    self.global_p1_search_start_offset = search_p2_from
+        queued = set(self.awaiting_content_indices)
+        for key in completed_keys:
+            for pair_index in self.pairs_by_p1_key.get(key, ()):
+                pair = self.all_target_pairs[pair_index]
+                if pair.p1_found_at_index == -1 and not pair.is_permanently_skipped:
+                    self.seen_unfound_p1_indices.add(pair_index)
+                    queued.add(pair_index)
+            for pair_index in self.pairs_by_p2_key.get(key, ()):
+                pair = self.all_target_pairs[pair_index]
+                if pair.p1_found_at_index != -1 and pair.p2_conceptual_end_index == -1:
+                    queued.add(pair_index)
+        worklist = sorted(queued)  # a sorted list is a valid heap
+        while worklist:
+            current_pair = self.all_target_pairs[heapq.heappop(worklist)]
+            search_offset = self.global_p1_search_start_offset
+            self._advance_pair(current_pair, text_buffer)
+            if self.global_p1_search_start_offset != search_offset:
+                # Pairs before this one have their P1 found or are skipped, so these all come later
+                for pair_index in self.seen_unfound_p1_indices - queued:
+                    queued.add(pair_index)
+                    heapq.heappush(worklist, pair_index)
+
+    def _advance_pair(self, current_pair, text_buffer):
+        """Finds the keys of one pair, checks its content and writes it out once it qualifies."""
+        if current_pair.is_permanently_skipped or current_pair.is_fully_processed:
+            return
+
+        # 1. Find P1 Key
+        if current_pair.p1_found_at_index == -1:
+            found_idx = self.key_automaton.find(current_pair.p1_key_text, self.global_p1_search_start_offset)
+            if found_idx != -1:
+                current_pair.p1_found_at_index = found_idx
+                logging.info(f"  Found P1='{current_pair.p1_key_text}' for pair {current_pair.original_list_index} "
+                             f"at index {found_idx} (searched from {self.global_p1_search_start_offset}).")
+                # Every earlier pair whose P1 is still unfound is skipped: they lead the sorted list
+                position = bisect.bisect_left(self.unfound_p1_indices, current_pair.original_list_index)
+                for prev_pair_scan_idx in self.unfound_p1_indices[:position]:
+                    earlier_pair = self.all_target_pairs[prev_pair_scan_idx]
+                    earlier_pair.is_permanently_skipped = True
+                    self.seen_unfound_p1_indices.discard(prev_pair_scan_idx)
+                    logging.info(f"    INFO: Pair {earlier_pair.original_list_index} "
+                                 f"('{earlier_pair.p1_key_text}') was not found before pair "
+                                 f"{current_pair.original_list_index}. Permanently skipping.")
+                del self.unfound_p1_indices[: position + 1]  # the skipped pairs and this one
+                self.seen_unfound_p1_indices.discard(current_pair.original_list_index)
+
+        # 2. Find P2 Key
+        if current_pair.p1_found_at_index != -1 and current_pair.p2_conceptual_end_index == -1:
+            search_p2_from = current_pair.p1_end_index()
+            if current_pair.p2_key_text:
+                found_idx2 = self.key_automaton.find(current_pair.p2_key_text, search_p2_from)
+                if found_idx2 != -1:
+                    current_pair.p2_conceptual_end_index = found_idx2
+                    logging.info(f"  Found P2='{current_pair.p2_key_text}' for pair {current_pair.original_list_index} "
+                                 f"at index {found_idx2}.")
+                    content_between_start = search_p2_from
+                    content_between_end = found_idx2
+                    length_between = content_between_end - content_between_start
+                    offset_in_between = max(0, length_between - OFFSET_CHARS_FOR_NEXT_P1_SEARCH)
+                    self.global_p1_search_start_offset = content_between_start + offset_in_between
                     logging.info(f"    Updated global P1 search offset to: {self.global_p1_search_start_offset}.")
+            else: # P2 is empty
+                current_pair.p2_conceptual_end_index = search_p2_from
+                logging.info(f"  P2 is empty for pair {current_pair.original_list_index}, conceptual end at {search_p2_from}.")
+                self.global_p1_search_start_offset = search_p2_from
+                logging.info(f"    Updated global P1 search offset to: {self.global_p1_search_start_offset}.")
+        
+        # 3. Check content conditions if keys found
+        if current_pair.are_both_keys_found() and not current_pair.is_fully_processed:
+            # Non-whitespace counts (capped at the threshold) come from the prefix index
+            if current_pair.requires_before_content_check and not current_pair.before_content_sufficient:
+                count = min(self.non_whitespace_index.count(0, current_pair.p1_found_at_index),
+                            REQUIRED_NON_WHITESPACE_AROUND_KEYS)
+                current_pair.actual_before_nw_count = count
+                if count >= REQUIRED_NON_WHITESPACE_AROUND_KEYS: current_pair.before_content_sufficient = True
             
-            # 3. Check content conditions if keys found
-            if current_pair.are_both_keys_found() and not current_pair.is_fully_processed:
-                if current_pair.requires_before_content_check and not current_pair.before_content_sufficient:
-                    is_sufficient, count = count_non_whitespace_threshold(
-                        full_text_so_far, 0, current_pair.p1_found_at_index, REQUIRED_NON_WHITESPACE_AROUND_KEYS
-                    )
-                    current_pair.actual_before_nw_count = count
-                    if is_sufficient: current_pair.before_content_sufficient = True
-                
-                after_content_starts_at = current_pair.p2_actual_content_end_index()
-                if current_pair.requires_after_content_check and not current_pair.after_content_sufficient:
-                    is_sufficient, count = count_non_whitespace_threshold(
-                        full_text_so_far, after_content_starts_at, 
-                        self.current_total_text_length, REQUIRED_NON_WHITESPACE_AROUND_KEYS
-                    )
-                    current_pair.actual_after_nw_count = count
-                    if is_sufficient: current_pair.after_content_sufficient = True
-
-                all_conditions_met = True
-                if current_pair.requires_before_content_check and not current_pair.before_content_sufficient:
-                    all_conditions_met = False
-                if current_pair.requires_after_content_check and not current_pair.after_content_sufficient:
-                    all_conditions_met = False
-                
-                log_before = current_pair.actual_before_nw_count if current_pair.requires_before_content_check else 'N/A'
-                log_after = current_pair.actual_after_nw_count if current_pair.requires_after_content_check else 'N/A'
-                logging.debug(f"  Pair {current_pair.original_list_index} ('{current_pair.p1_key_text}', '{current_pair.p2_key_text or '<END>'}'): "
-                              f"Before OK? ({current_pair.before_content_sufficient if current_pair.requires_before_content_check else 'N/A'}), Cnt: {log_before}. "
-                              f"After OK? ({current_pair.after_content_sufficient if current_pair.requires_after_content_check else 'N/A'}), Cnt: {log_after}.")
-
-                if all_conditions_met:
-                    current_pair.is_fully_processed = True
-                    if current_pair.is_candidate_for_deferred_write:
-                        logging.info(f"\n!!! DEFERRED: Pair {current_pair.original_list_index} qualified. File later. !!!")
-                        self.deferred_final_pair_object = current_pair
-                    else:
-                        logging.info(f"\n!!! QUALIFIED PAIR: {current_pair.original_list_index}. Saving. !!!")
-                        segments = self._extract_and_format_segments(current_pair, full_text_so_far)
-                        self._save_pair_data_to_file(segments, current_pair.p1_key_text, current_pair.p2_key_text)
+            after_content_starts_at = current_pair.p2_actual_content_end_index()
+            if current_pair.requires_after_content_check and not current_pair.after_content_sufficient:
+                count = min(self.non_whitespace_index.count(after_content_starts_at, self.current_total_text_length),
+                            REQUIRED_NON_WHITESPACE_AROUND_KEYS)
+                current_pair.actual_after_nw_count = count
+                if count >= REQUIRED_NON_WHITESPACE_AROUND_KEYS: current_pair.after_content_sufficient = True
+
+            all_conditions_met = True
+            if current_pair.requires_before_content_check and not current_pair.before_content_sufficient:
+                all_conditions_met = False
+            if current_pair.requires_after_content_check and not current_pair.after_content_sufficient:
+                all_conditions_met = False
+            
+            log_before = current_pair.actual_before_nw_count if current_pair.requires_before_content_check else 'N/A'
+            log_after = current_pair.actual_after_nw_count if current_pair.requires_after_content_check else 'N/A'
+            logging.debug(f"  Pair {current_pair.original_list_index} ('{current_pair.p1_key_text}', '{current_pair.p2_key_text or '<END>'}'): "
+                          f"Before OK? ({current_pair.before_content_sufficient if current_pair.requires_before_content_check else 'N/A'}), Cnt: {log_before}. "
+                          f"After OK? ({current_pair.after_content_sufficient if current_pair.requires_after_content_check else 'N/A'}), Cnt: {log_after}.")
+
+            if not all_conditions_met:
+                self.awaiting_content_indices.add(current_pair.original_list_index)
+            else:
+                self.awaiting_content_indices.discard(current_pair.original_list_index)
+                current_pair.is_fully_processed = True
+                if current_pair.is_candidate_for_deferred_write:
+                    logging.info(f"\n!!! DEFERRED: Pair {current_pair.original_list_index} qualified. File later. !!!")
+                    self.deferred_final_pair_object = current_pair
+                else:
+                    logging.info(f"\n!!! QUALIFIED PAIR: {current_pair.original_list_index}. Saving. !!!")
+                    segments = self._extract_and_format_segments(current_pair, text_buffer)
+                    self._save_pair_data_to_file(segments, current_pair.p1_key_text, current_pair.p2_key_text)
 
     def finalize_processing(self):
         """Called after all chunks are processed to handle deferred items and summarize."""
-        final_complete_text = self.cumulative_text_buffer.getvalue()
         if self.deferred_final_pair_object:
             pair_to_save = self.deferred_final_pair_object
             if not pair_to_save.is_permanently_skipped: # Should be true if it was deferred
                 logging.info(f"\n--- Processing DEFERRED final pair ('{pair_to_save.p1_key_text}', "
                              f"'{pair_to_save.p2_key_text or '<END>'}') after stream completion ---")
-                segments = self._extract_and_format_segments(pair_to_save, final_complete_text)
+                segments = self._extract_and_format_segments(pair_to_save, self.cumulative_text_buffer)
                 self._save_pair_data_to_file(segments, pair_to_save.p1_key_text, pair_to_save.p2_key_text)
             else:
                 logging.warning(f"Deferred pair {pair_to_save} was marked as skipped. Not saving.")
@@ -274,5 +332,3 @@ class KeyPairProcessor:
             logging.info(f"Total fully qualified pair files saved: {self.processed_files_count}")
         else:
             logging.info("No fully qualified target pairs were detected and saved.")
-        
-        self.cumulative_text_buffer.close()
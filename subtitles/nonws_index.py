@@ -0,0 +1,103 @@
+from itertools import islice
+from typing import List, Tuple
+import bisect
+import re
+
+# In str patterns \s matches exactly the characters for which str.isspace() is True
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NON_WHITESPACE_PATTERN = re.compile(r'\S')
+
+def count_non_whitespace(text: str) -> int:
+    """Number of non-whitespace characters in text (one pass in C)."""
+    return len(WHITESPACE_PATTERN.sub("", text))
+
+class NonWhitespaceIndex:
+    """
+    Running count of non-whitespace characters for a text that grows chunk by chunk.
+    Appending counts the chunk once; a query bisects the per-chunk prefix counts and
+    then looks inside a single chunk, so the content checks never walk the whole
+    text character by character.
+    """
+    def __init__(self):
+        self.chunks: List[str] = []        # the chunks themselves (references, not copies)
+        self.chunk_starts: List[int] = []  # offset of each chunk in the text
+        self.counts_before: List[int] = [] # non-whitespace characters before each chunk
+        self.text_length = 0
+        self.total_count = 0
+
+    def append(self, chunk_text: str) -> None:
+        """Indexes the next chunk of the text."""
+        if not chunk_text:
+            return
+        self.chunks.append(chunk_text)
+        self.chunk_starts.append(self.text_length)
+        self.counts_before.append(self.total_count)
+        self.text_length += len(chunk_text)
+        self.total_count += count_non_whitespace(chunk_text)
+
+    def prefix_count(self, position: int) -> int:
+        """Number of non-whitespace characters in text[:position]."""
+        if position <= 0:
+            return 0
+        if position >= self.text_length:
+            return self.total_count
+        c = bisect.bisect_right(self.chunk_starts, position) - 1
+        return self.counts_before[c] + count_non_whitespace(self.chunks[c][: position - self.chunk_starts[c]])
+
+    def count(self, start: int, end: int) -> int:
+        """Number of non-whitespace characters in text[start:end]."""
+        return self.prefix_count(end) - self.prefix_count(start) if end > start else 0
+
+    def _position_of_rank(self, rank: int) -> int:
+        """Index of the rank-th (1-based) non-whitespace character of the text, or -1."""
+        if rank < 1 or rank > self.total_count:
+            return -1
+        c = bisect.bisect_left(self.counts_before, rank) - 1
+        match = next(islice(NON_WHITESPACE_PATTERN.finditer(self.chunks[c]), rank - self.counts_before[c] - 1, None))
+        return self.chunk_starts[c] + match.start()
+
+    def nth_before(self, position: int, n: int) -> int:
+        """
+        Index of the n-th non-whitespace character counting back from position (exclusive).
+
+        Returns:
+            The index, or -1 when text[:position] holds fewer than n of them.
+        """
+        return self._position_of_rank(self.prefix_count(position) - n + 1) if n > 0 else -1
+
+    def nth_after(self, position: int, n: int) -> int:
+        """
+        Index of the n-th non-whitespace character counting forward from position (inclusive).
+
+        Returns:
+            The index, or -1 when text[position:] holds fewer than n of them.
+        """
+        return self._position_of_rank(self.prefix_count(position) + n) if n > 0 else -1
+
+    def extract_bounds(self, start: int, end: int, n_chars_to_extract: int, from_start: bool = True) -> Tuple[int, int]:
+        """
+        Range of text[start:end] holding its first (from_start) or last n non-whitespace
+        characters, with the same edge rules as extract_n_non_whitespace in withoutregex.py:
+        the whole range when it holds fewer, nothing when it holds none and from_start is False.
+
+        Args:
+            start: Start of the source range.
+            end: End of the source range.
+            n_chars_to_extract: Non-whitespace characters wanted.
+            from_start: Take them from the start of the range (True) or from its end.
+
+        Returns:
+            (a, b) with a == b for an empty result.
+        """
+        end = min(end, self.text_length)
+        if start >= end or n_chars_to_extract <= 0:
+            return start, start
+        if from_start:
+            nth = self.nth_after(start, n_chars_to_extract)
+            # Fewer than n: the whole range (whitespace included) is kept
+            return (start, nth + 1) if start <= nth < end else (start, end)
+        nth = self.nth_before(end, n_chars_to_extract)
+        if start <= nth:
+            return nth, end
+        # Fewer than n: the whole range, unless it holds no non-whitespace at all
+        return (start, end) if self.count(start, end) else (end, end)
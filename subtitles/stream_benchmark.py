@@ -0,0 +1,223 @@
+"""
+Offline throughput benchmark of KeyPairProcessor, fed by stream_clients.ReplayClient.
+
+    python stream_benchmark.py --sizes 1000 10000 100000 --out stream_bench.json
+    python stream_benchmark.py --replay generated_llm_output_raw_stream.txt --pairs pairs.json
+
+Without --replay, each size gets a synthetic model output of that many characters:
+a JSON array of {key: text} objects like the translation responses, with a key
+every --segment-chars characters. For each run it reports:
+  - CPU time of process_chunk per chunk (time.process_time),
+  - per-key discovery latency: from the arrival of the chunk that completes a P1
+    key to the processor having located it, in chunks and milliseconds,
+  - qualification latency: from the arrival of the chunk that completes the pair's
+    second key to the pair being written (this includes waiting for the 150
+    non-whitespace characters after it),
+  - peak memory allocated while processing (tracemalloc, in a separate pass so
+    tracing does not inflate the timings).
+Log output of the processor is silenced during the runs.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import bisect
+import json
+import logging
+import random
+import statistics
+import string
+import tempfile
+import time
+import tracemalloc
+
+from keypair_processor import KeyPairProcessor
+from stream_clients import ReplayClient
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_SEGMENT_CHARS = 400  # characters per keyed segment of a synthetic output
+KEY_LENGTH = 6
+FILLER_WORDS = ("xin", "chào", "các", "bạn", "hôm", "nay", "chúng", "ta", "sẽ", "nói", "về",
+                "một", "câu", "chuyện", "rất", "thú", "vị", "(", ")", "và", "những", "điều", "mới")
+
+def make_output(n_chars: int, segment_chars: int = DEFAULT_SEGMENT_CHARS,
+                seed: int = 0) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Synthetic model output of about n_chars characters and its key pair definitions.
+
+    Returns:
+        (text, [(p1, p2), ...]) with consecutive keys paired and (last_key, '') at the end.
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    keys, parts, length = [], ["[\n"], 2
+    while length < n_chars or not keys:
+        key = "".join(rng.choice(alphabet) for _ in range(KEY_LENGTH))
+        words = []
+        budget = max(1, min(segment_chars, n_chars - length) - KEY_LENGTH - 16)
+        while sum(len(word) + 1 for word in words) < budget:
+            words.append(rng.choice(FILLER_WORDS))
+        segment = f'  {{\n    "{key}": "{" ".join(words)}"\n  }},\n'
+        keys.append(key)
+        parts.append(segment)
+        length += len(segment)
+    parts[-1] = parts[-1][:-2] + "\n"
+    parts.append("]\n")
+    return "".join(parts), list(zip(keys, keys[1:])) + [(keys[-1], '')]
+
+def _summary(values: List[float]) -> Dict[str, Optional[float]]:
+    """Mean, median, p95 and max of values (None for an empty list)."""
+    if not values:
+        return {"mean": None, "median": None, "p95": None, "max": None}
+    ordered = sorted(values)
+    return {
+        "mean": statistics.fmean(ordered),
+        "median": statistics.median(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max": ordered[-1],
+    }
+
+def _completing_chunk(chunk_ends: List[int], end: int) -> int:
+    """Index of the chunk during which the stream reaches end characters."""
+    return bisect.bisect_left(chunk_ends, end)
+
+def time_run(client: ReplayClient, pair_definitions: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Streams the client through a fresh KeyPairProcessor; CPU and latency figures."""
+    chunk_cpu, arrivals, found_at = [], [], {}
+    with tempfile.TemporaryDirectory() as output_directory:
+        processor = KeyPairProcessor(pair_definitions, output_directory)
+        pending = list(processor.all_target_pairs)
+        started = time.perf_counter()
+        for chunk_index, chunk_text in enumerate(client.stream()):
+            arrivals.append(time.perf_counter())
+            cpu = time.process_time()
+            processor.process_chunk(chunk_text)
+            chunk_cpu.append(time.process_time() - cpu)
+            done = time.perf_counter()
+            still_pending = []
+            for pair in pending:
+                if pair.p1_found_at_index != -1 and ("p1", pair.original_list_index) not in found_at:
+                    found_at[("p1", pair.original_list_index)] = (chunk_index, done)
+                if pair.is_fully_processed:
+                    found_at[("qualified", pair.original_list_index)] = (chunk_index, done)
+                elif not pair.is_permanently_skipped:
+                    still_pending.append(pair)
+            pending = still_pending
+        processor.finalize_processing()
+        elapsed = time.perf_counter() - started
+
+    chunk_ends, total = [], 0
+    for chunk_text in client.chunks():
+        total += len(chunk_text)
+        chunk_ends.append(total)
+    discovery_chunks, discovery_ms, qualify_chunks, qualify_ms = [], [], [], []
+    for pair in processor.all_target_pairs:
+        if ("p1", pair.original_list_index) in found_at:
+            completed = _completing_chunk(chunk_ends, pair.p1_end_index())
+            chunk_index, when = found_at[("p1", pair.original_list_index)]
+            discovery_chunks.append(chunk_index - completed)
+            discovery_ms.append((when - arrivals[completed]) * 1000)
+        if ("qualified", pair.original_list_index) in found_at and not pair.is_candidate_for_deferred_write:
+            completed = _completing_chunk(chunk_ends, pair.p2_actual_content_end_index())
+            chunk_index, when = found_at[("qualified", pair.original_list_index)]
+            qualify_chunks.append(chunk_index - completed)
+            qualify_ms.append((when - arrivals[completed]) * 1000)
+
+    return {
+        "chunks": len(chunk_cpu),
+        "characters": total,
+        "seconds": elapsed,
+        "chars_per_second": total / elapsed if elapsed > 0 else None,
+        "cpu_us_per_chunk": _summary([t * 1e6 for t in chunk_cpu]),
+        "keys_found": len(discovery_chunks),
+        "pairs_qualified": processor.processed_files_count,
+        "discovery_latency_chunks": _summary(discovery_chunks),
+        "discovery_latency_ms": _summary(discovery_ms),
+        "qualification_latency_chunks": _summary(qualify_chunks),
+        "qualification_latency_ms": _summary(qualify_ms),
+    }
+
+def memory_run(client: ReplayClient, pair_definitions: List[Tuple[str, str]]) -> float:
+    """Peak memory (MB) allocated by a KeyPairProcessor over the whole stream."""
+    chunks = client.chunks()  # the replayed text itself is not counted
+    with tempfile.TemporaryDirectory() as output_directory:
+        tracemalloc.start()
+        try:
+            processor = KeyPairProcessor(pair_definitions, output_directory)
+            for chunk_text in chunks:
+                processor.process_chunk(chunk_text)
+            processor.finalize_processing()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return peak / 2**20
+
+def benchmark(text: str, pair_definitions: List[Tuple[str, str]], repeat: int = 3, **client_options) -> Dict[str, Any]:
+    """Best-of-repeat timings (by wall time) and peak memory for one replayed output."""
+    client = ReplayClient(text, **client_options)
+    runs = [time_run(client, pair_definitions) for _ in range(max(1, repeat))]
+    result = min(runs, key=lambda run: run["seconds"])
+    result["keys"] = len(pair_definitions)
+    result["peak_memory_mb"] = memory_run(client, pair_definitions)
+    return result
+
+def _format_row(label: str, result: Dict[str, Any]) -> str:
+    cpu = result["cpu_us_per_chunk"]
+    discovery = result["discovery_latency_ms"]
+    qualify = result["qualification_latency_ms"]
+    fmt = lambda value: "-" if value is None else f"{value:.3f}"
+    return (f"{label:>10} {result['characters']:>9} {result['chunks']:>7} {result['keys']:>5} "
+            f"{fmt(cpu['mean']):>9} {fmt(cpu['p95']):>9} {fmt(discovery['median']):>9} "
+            f"{fmt(discovery['max']):>9} {fmt(qualify['median']):>9} {result['peak_memory_mb']:>8.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="synthetic output sizes in characters")
+    parser.add_argument("--segment-chars", type=int, default=DEFAULT_SEGMENT_CHARS,
+                        help="characters per keyed segment of a synthetic output")
+    parser.add_argument("--replay", help="saved stream file (*_raw_stream.txt / *_stream.txt) to replay instead")
+    parser.add_argument("--pairs", help="JSON list of [p1, p2] key pairs for --replay")
+    parser.add_argument("--chunk-size", type=int, nargs="+", default=[64], metavar="N",
+                        help="chunk size, or MIN MAX for random sizes")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between chunks")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- seconds added to each delay")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per workload (best is kept)")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args(argv)
+
+    if len(args.chunk_size) > 2:
+        parser.error("--chunk-size takes N or MIN MAX")
+    chunk_size = args.chunk_size[0] if len(args.chunk_size) == 1 else tuple(args.chunk_size)
+    client_options = {"chunk_size": chunk_size, "delay": args.delay, "jitter": args.jitter, "seed": args.seed}
+
+    if args.replay:
+        if not args.pairs:
+            parser.error("--replay needs --pairs")
+        with open(args.replay, "r", encoding="utf-8") as f:
+            text = f.read()
+        with open(args.pairs, "r", encoding="utf-8") as f:
+            pair_definitions = [tuple(pair) for pair in json.load(f)]
+        workloads = [(args.replay, text, pair_definitions)]
+    else:
+        workloads = [(str(size), *make_output(size, args.segment_chars, args.seed)) for size in args.sizes]
+
+    logging.disable(logging.CRITICAL)
+    try:
+        results = {}
+        for label, text, pair_definitions in workloads:
+            results[label] = benchmark(text, pair_definitions, args.repeat, **client_options)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    print(f"{'workload':>10} {'chars':>9} {'chunks':>7} {'keys':>5} {'cpu_us':>9} {'cpu_p95':>9} "
+          f"{'find_ms':>9} {'find_max':>9} {'qual_ms':>9} {'peak_mb':>8}")
+    for label, result in results.items():
+        print(_format_row(label if len(label) <= 10 else "..." + label[-7:], result))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"client": {**client_options, "chunk_size": args.chunk_size}, "results": results}, f, indent=2)
+        print(f"Results written to '{args.out}'")
+
+if __name__ == "__main__":
+    main()
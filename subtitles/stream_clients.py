@@ -0,0 +1,143 @@
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
+import asyncio
+import logging
+import random
+import time
+
+try:
+    from google import genai
+    from google.genai import types
+except ImportError:  # only the Gemini client needs it
+    genai = None
+    types = None
+
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL_NAME = "gemini-2.5-flash-preview-05-20"
+TRANSLATION_INSTRUCTION = "Translate to Vietnamese. Keep `(` and `)`. Output as JSON."
+
+# --- Streaming clients ---
+# A client turns one prompt into a stream of text chunks: `stream(prompt)` is an
+# iterator of str and `astream(prompt)` its async counterpart. The streaming
+# scripts and the translation scheduler only rely on that, so ReplayClient (or
+# any fake) can stand in for the API when testing or profiling offline.
+
+def default_generation_config(temperature: float = 1.5, top_p: float = 0.5):
+    """Generation settings used by the streaming scripts (gemini_requester.py defaults)."""
+    if types is None:
+        raise ImportError("google-genai is not installed (pip install google-genai).")
+    return types.GenerateContentConfig(
+        temperature=temperature, top_p=top_p, candidate_count=1, max_output_tokens=65000,
+        thinking_config=types.ThinkingConfig(thinking_budget=500),
+        response_mime_type="text/plain",
+        system_instruction=[types.Part.from_text(text=TRANSLATION_INSTRUCTION)]
+    )
+
+class GeminiStreamClient:
+    """Gemini streaming client with the `stream(prompt)` / `astream(prompt)` interface."""
+    def __init__(self, api_key: str, model_name: str = GEMINI_MODEL_NAME, generation_config=None):
+        if genai is None:
+            raise ImportError("google-genai is not installed (pip install google-genai).")
+        self.client = genai.Client(api_key=api_key)
+        self.model_name = model_name
+        self.generation_config = generation_config or default_generation_config()
+
+    def _contents(self, prompt: str):
+        return [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Streams the response to prompt (blocking).
+
+        Args:
+            prompt: Text sent as the user turn.
+
+        Returns:
+            An iterator over the non-empty text chunks, in order.
+        """
+        stream = self.client.models.generate_content_stream(
+            model=f"models/{self.model_name}", contents=self._contents(prompt), config=self.generation_config
+        )
+        for chunk_num, chunk in enumerate(stream):
+            text: Optional[str] = getattr(chunk, 'text', None)
+            if not text:
+                logger.debug(f"Chunk {chunk_num + 1} has no text, skipping.")
+                continue
+            yield text
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        Streams the response to prompt.
+
+        Args:
+            prompt: Text sent as the user turn.
+
+        Returns:
+            An async iterator over the non-empty text chunks, in order.
+        """
+        stream = await self.client.aio.models.generate_content_stream(
+            model=f"models/{self.model_name}", contents=self._contents(prompt), config=self.generation_config
+        )
+        chunk_num = 0
+        async for chunk in stream:
+            chunk_num += 1
+            text: Optional[str] = getattr(chunk, 'text', None)
+            if not text:
+                logger.debug(f"Chunk {chunk_num} has no text, skipping.")
+                continue
+            yield text
+
+class ReplayClient:
+    """
+    Offline client that streams back a saved response (e.g. a *_raw_stream.txt or
+    *_stream.txt file written by the streaming scripts), whatever the prompt.
+    chunk_size is a fixed size or a (min, max) range drawn per chunk; delay and
+    jitter (seconds) space the chunks like a live stream. `seed` makes the chunking
+    and the delays reproducible.
+    """
+    def __init__(self, text: str, chunk_size: Union[int, Tuple[int, int]] = 64,
+                 delay: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None):
+        low, high = chunk_size if isinstance(chunk_size, tuple) else (chunk_size, chunk_size)
+        if low < 1 or high < low:
+            raise ValueError("chunk_size must be >= 1 (or a (min, max) range with 1 <= min <= max).")
+        self.text = text
+        self.chunk_size = (low, high)
+        self.delay = delay
+        self.jitter = jitter
+        self.seed = seed
+
+    @classmethod
+    def from_file(cls, path: str, **options) -> "ReplayClient":
+        """ReplayClient for a saved stream file."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(f.read(), **options)
+
+    def chunks(self) -> List[str]:
+        """The chunks one replay yields (the same ones on every call when seeded)."""
+        rng = random.Random(self.seed)
+        low, high = self.chunk_size
+        chunks, i = [], 0
+        while i < len(self.text):
+            size = low if low == high else rng.randint(low, high)
+            chunks.append(self.text[i : i + size])
+            i += size
+        return chunks
+
+    def _delays(self, count: int) -> List[float]:
+        rng = random.Random(None if self.seed is None else self.seed + 1)
+        return [max(0.0, self.delay + rng.uniform(-self.jitter, self.jitter)) for _ in range(count)]
+
+    def stream(self, prompt: str = "") -> Iterator[str]:
+        """Yields the saved response chunk by chunk, sleeping between chunks (prompt is ignored)."""
+        chunks = self.chunks()
+        for chunk_text, pause in zip(chunks, self._delays(len(chunks))):
+            if pause:
+                time.sleep(pause)
+            yield chunk_text
+
+    async def astream(self, prompt: str = "") -> AsyncIterator[str]:
+        """Async version of stream()."""
+        chunks = self.chunks()
+        for chunk_text, pause in zip(chunks, self._delays(len(chunks))):
+            await asyncio.sleep(pause)
+            yield chunk_text
@@ -0,0 +1,132 @@
+import logging
+import random
+
+import pytest
+
+from keypair_processor import (KeyPairProcessor, OFFSET_CHARS_FOR_NEXT_P1_SEARCH,
+                               REQUIRED_NON_WHITESPACE_AROUND_KEYS as REQUIRED)
+
+def leading_non_whitespace(text, n):
+    """Prefix of text holding its first n non-whitespace characters (all of it if fewer)."""
+    count = 0
+    for i, char in enumerate(text):
+        count += not char.isspace()
+        if count == n:
+            return text[: i + 1]
+    return text
+
+def trailing_non_whitespace(text, n):
+    """Suffix of text holding its last n non-whitespace characters (all of it if fewer, '' if none)."""
+    count = 0
+    for i in range(len(text) - 1, -1, -1):
+        count += not text[i].isspace()
+        if count == n:
+            return text[i:]
+    return text if count else ""
+
+def reference_run(pair_definitions, chunks):
+    """
+    The processor before it was made incremental: on every chunk, every pair is looked up
+    with str.find in the whole text so far. Returns ([(p1, p2, segments) in write order],
+    [skipped flag per pair]).
+    """
+    n = len(pair_definitions)
+    p1_at, p2_at = [-1] * n, [-1] * n
+    skipped, done = [False] * n, [False] * n
+    saved, deferred, offset, text = [], None, 0, ""
+
+    def segments(i, text):
+        p1, p2 = pair_definitions[i]
+        last_open = i == n - 1 and not p2
+        p1_end = p1_at[i] + len(p1)
+        return {
+            'before': trailing_non_whitespace(text[: p1_at[i]], REQUIRED) if i else "",
+            'key1': p1,
+            'between': text[p1_end:] if last_open else text[p1_end : p2_at[i]],
+            'key2': p2,
+            'after': "" if last_open else leading_non_whitespace(text[p2_at[i] + len(p2):], REQUIRED),
+        }
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        text += chunk
+        for i, (p1, p2) in enumerate(pair_definitions):
+            if skipped[i] or done[i]:
+                continue
+            if p1_at[i] == -1:
+                p1_at[i] = text.find(p1, offset)
+                if p1_at[i] != -1:
+                    for j in range(i):
+                        if p1_at[j] == -1:
+                            skipped[j] = True
+            if p1_at[i] != -1 and p2_at[i] == -1:
+                p1_end = p1_at[i] + len(p1)
+                if p2:
+                    p2_at[i] = text.find(p2, p1_end)
+                    if p2_at[i] != -1:
+                        offset = p1_end + max(0, p2_at[i] - p1_end - OFFSET_CHARS_FOR_NEXT_P1_SEARCH)
+                else:
+                    p2_at[i] = offset = p1_end
+            if p1_at[i] != -1 and p2_at[i] != -1:
+                last_open = i == n - 1 and not p2
+                before_ok = i == 0 or sum(not c.isspace() for c in text[: p1_at[i]]) >= REQUIRED
+                after_ok = last_open or sum(not c.isspace() for c in text[p2_at[i] + len(p2):]) >= REQUIRED
+                if before_ok and after_ok:
+                    done[i] = True
+                    if last_open:
+                        deferred = i
+                    else:
+                        saved.append((p1, p2, segments(i, text)))
+    if deferred is not None:
+        saved.append((*pair_definitions[deferred], segments(deferred, text)))
+    return saved, skipped
+
+def random_case(rng):
+    """Key pairs and a stream where keys may come out of order, repeat, or be missing."""
+    keys = ["".join(rng.choice("xyzw") for _ in range(rng.randint(1, 3))) for _ in range(rng.randint(1, 10))]
+    if rng.random() < 0.5:
+        pairs = [(keys[i], keys[i + 1] if i + 1 < len(keys) else "") for i in range(len(keys))]
+    else:  # arbitrary pairs, some with an empty P2 before the end
+        pairs = [(rng.choice(keys), rng.choice(keys + [""])) for _ in range(rng.randint(1, 10))]
+    order = keys[:] if rng.random() < 0.3 else [rng.choice(keys) for _ in range(rng.randint(1, 25))]
+    parts = []
+    for key in order:
+        parts.append("".join(rng.choice("ab \ncd") for _ in range(rng.choice([5, 60, 300, 600]))))
+        parts.append(key)
+    # Often fewer than REQUIRED non-whitespace characters after the last key
+    parts.append("".join(rng.choice("ab \ncd") for _ in range(rng.choice([0, 40, 150, 400]))))
+    return pairs, "".join(parts)
+
+def random_chunks(rng, text):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 60)))) if len(text) > 1 else []
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_reference_processor(tmp_path, seed):
+    rng = random.Random(seed)
+    covered = {"skipped": 0, "written": 0, "deferred": 0, "unqualified": 0}
+    logging.disable(logging.CRITICAL)
+    try:
+        for case in range(150):
+            pairs, text = random_case(rng)
+            for chunking in range(3):  # the same stream in different chunkings
+                chunks = random_chunks(rng, text)
+                expected_saved, expected_skipped = reference_run(pairs, chunks)
+                saved = []
+                processor = KeyPairProcessor(pairs, str(tmp_path / f"{case}_{chunking}"),
+                                             on_qualified=lambda p1, p2, segments: saved.append((p1, p2, segments)))
+                for chunk in chunks:
+                    processor.process_chunk(chunk)
+                processor.finalize_processing()
+
+                assert saved == expected_saved
+                assert [pair.is_permanently_skipped for pair in processor.all_target_pairs] == expected_skipped
+                assert processor.processed_files_count == len(saved)
+            covered["skipped"] += any(expected_skipped)
+            covered["written"] += len(expected_saved)
+            covered["deferred"] += bool(expected_saved) and not pairs[-1][1] and expected_saved[-1][0] == pairs[-1][0]
+            covered["unqualified"] += len(expected_saved) < len(pairs) - sum(expected_skipped)
+    finally:
+        logging.disable(logging.NOTSET)
+    assert all(covered.values()), covered
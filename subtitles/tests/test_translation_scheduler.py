@@ -0,0 +1,42 @@
+import asyncio
+import json
+import time
+
+from translation_scheduler import TranslationScheduler
+
+class EchoClient:
+    """
+    Streams the prompt back as the response (an identity translation), recording request
+    starts. The first `slow` requests hold their slot for about a second, so batches queue
+    for a slot while the token bucket refills.
+    """
+    def __init__(self, chunk_size=40, chunk_delay=0.002, slow=2, slow_seconds=1.0):
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.slow = slow
+        self.slow_seconds = slow_seconds
+        self.starts = []
+
+    async def astream(self, prompt):
+        self.starts.append(time.monotonic())
+        if len(self.starts) <= self.slow:
+            await asyncio.sleep(self.slow_seconds)
+        for i in range(0, len(prompt), self.chunk_size):
+            await asyncio.sleep(self.chunk_delay)
+            yield prompt[i : i + self.chunk_size]
+
+def test_request_starts_respect_rate_limit(tmp_path):
+    segments = [{f"k{i:03d}": f"segment {i} " + "lorem ipsum dolor " * 12} for i in range(40)]
+    client = EchoClient()
+    rate, burst = 10.0, 2  # 600 requests per minute
+    scheduler = TranslationScheduler(client, str(tmp_path), concurrency=2, requests_per_minute=60 * rate,
+                                     burst=burst, segments_per_request=2)
+    translated = asyncio.run(scheduler.run(segments))
+
+    assert translated == [(key, text) for segment in segments for key, text in segment.items()]
+    starts = sorted(client.starts)
+    assert len(starts) == 20
+    # Any window of the run holds at most burst + rate * its length request starts (20 ms timer slack)
+    for i in range(len(starts)):
+        for j in range(i, len(starts)):
+            assert j - i + 1 <= burst + rate * (starts[j] - starts[i] + 0.02)
@@ -0,0 +1,254 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+from keypair_processor import KeyPairProcessor
+from input_manipulation import process_subtitle_to_structured_data
+
+logger = logging.getLogger(__name__)
+
+# --- Scheduling defaults ---
+DEFAULT_CONCURRENCY = 4            # requests streaming at the same time
+DEFAULT_REQUESTS_PER_MINUTE = 30   # token bucket refill rate
+DEFAULT_BURST = 4                  # token bucket capacity
+DEFAULT_SEGMENTS_PER_REQUEST = 4   # keyed segments sent in one request
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 2.0      # first retry delay, doubled on each further attempt
+MAX_BACKOFF_SECONDS = 60.0
+
+# JSON framing around a segment value, for responses whose value cannot be parsed
+LEADING_FRAMING_PATTERN = re.compile(r'^\s*"?\s*:\s*"?')
+TRAILING_FRAMING_PATTERN = re.compile(r'"?[\s,{}\[\]]*"?\s*$')
+
+class TokenBucket:
+    """Asyncio token bucket: at most `capacity` requests at once, refilled at `rate` per second."""
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("Token bucket needs rate > 0 and capacity >= 1.")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()  # waiters are served in arrival order
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def format_batch_prompt(segments: List[Dict[str, str]]) -> str:
+    """Prompt for one request: its keyed segments as a JSON array of {key: text} objects."""
+    return json.dumps(segments, ensure_ascii=False, indent=2)
+
+def segment_value(between: str) -> str:
+    """
+    Translated text of one segment from the response text between its key and the next.
+    The response is a JSON array of {key: text} objects, so `between` looks like
+    '": "TEXT"\n  },\n  {\n    "'; the JSON string after the colon is decoded. When the
+    model broke the JSON there, the framing around the value is stripped instead.
+    """
+    match = LEADING_FRAMING_PATTERN.match(between)
+    value_start = match.end() - 1 if match.group().endswith('"') else -1
+    if value_start >= 0:
+        try:
+            value, _ = json.JSONDecoder().raw_decode(between, value_start)
+            if isinstance(value, str):
+                return value
+        except json.JSONDecodeError:
+            pass
+    logger.warning(f"Segment value is not a JSON string, stripping its framing: {between[:50]!r}...")
+    return TRAILING_FRAMING_PATTERN.sub("", between[match.end():])
+
+def build_batches(
+    text_array_with_segments: List[Dict[str, str]], segments_per_request: int
+) -> List[Tuple[List[Tuple[str, str]], List[Dict[str, str]]]]:
+    """
+    Splits the keyed segments into consecutive batches, one request each.
+
+    Args:
+        text_array_with_segments: [{key: text}, ...] from process_subtitle_to_structured_data.
+        segments_per_request: Segments per batch.
+
+    Returns:
+        [(key_pair_definitions, segments), ...]: the batch's consecutive key pairs, ending
+        with (last_key, '') as for a whole file, and its segments.
+    """
+    if segments_per_request < 1:
+        raise ValueError("segments_per_request must be at least 1.")
+    batches = []
+    for i in range(0, len(text_array_with_segments), segments_per_request):
+        segments = text_array_with_segments[i : i + segments_per_request]
+        keys = [key for segment in segments for key in segment]
+        pairs = list(zip(keys, keys[1:])) + [(keys[-1], '')]
+        batches.append((pairs, segments))
+    return batches
+
+class TranslationScheduler:
+    """
+    Sends batches of keyed segments as concurrent streaming requests.
+    At most `concurrency` streams run at once and request starts are rate limited by a
+    token bucket; a failed stream is retried from scratch (fresh KeyPairProcessor) with
+    exponential backoff and jitter. Each stream feeds its own KeyPairProcessor, and the
+    translated segments are reassembled in key order, so a whole file takes about as
+    long as its slowest batch rather than the sum of all of them.
+
+    `client` is anything with `astream(prompt)` returning an async iterator of text
+    chunks (stream_clients.GeminiStreamClient, or a fake one for offline runs).
+    """
+    def __init__(self, client, output_directory: str,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 burst: int = DEFAULT_BURST,
+                 segments_per_request: int = DEFAULT_SEGMENTS_PER_REQUEST,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+                 prompt_builder=format_batch_prompt):
+        self.client = client
+        self.output_directory = output_directory
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.segments_per_request = segments_per_request
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.prompt_builder = prompt_builder
+        self.batch_stats: List[Dict[str, Any]] = []
+
+    async def run(self, text_array_with_segments: List[Dict[str, str]]) -> List[Tuple[str, Optional[str]]]:
+        """
+        Translates every segment.
+
+        Args:
+            text_array_with_segments: [{key: text}, ...] from process_subtitle_to_structured_data.
+
+        Returns:
+            [(key, translated text or None), ...] in the original key order; None marks a
+            segment whose pair never qualified (or whose batch failed every attempt).
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.requests_per_minute / 60.0, self.burst)
+        batches = build_batches(text_array_with_segments, self.segments_per_request)
+        logger.info(f"Scheduling {len(batches)} request(s) for {len(text_array_with_segments)} segment(s), "
+                    f"concurrency {self.concurrency}, {self.requests_per_minute} request(s)/min.")
+        self.batch_stats = [None] * len(batches)
+        results = await asyncio.gather(*(
+            self._run_batch(index, pairs, segments, semaphore, bucket)
+            for index, (pairs, segments) in enumerate(batches)
+        ))
+
+        translated: Dict[str, str] = {}
+        for batch_result in results:
+            translated.update(batch_result)
+        ordered = [(key, translated.get(key)) for segment in text_array_with_segments for key in segment]
+        missing = sum(1 for _, text in ordered if text is None)
+        if missing:
+            logger.warning(f"{missing} segment(s) have no qualified translation.")
+        return ordered
+
+    async def _run_batch(self, index, pair_definitions, segments, semaphore, bucket) -> Dict[str, str]:
+        """Streams one batch (with retries); returns {p1 key: translated text of its segment}."""
+        prompt = self.prompt_builder(segments)
+        started_at = None  # first time the batch started a request (queueing is not counted)
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                # The token is taken only once a slot is held and right before the request, so
+                # batches queued for a slot cannot bank tokens and then start back to back
+                await bucket.acquire()
+                if started_at is None:
+                    started_at = time.monotonic()
+                qualified: Dict[str, str] = {}  # p1 key -> response text between it and the next key
+
+                def keep_between(p1_key, p2_key, segments):
+                    qualified[p1_key] = segments['between']
+
+                processor = KeyPairProcessor(pair_definitions, self.output_directory, on_qualified=keep_between)
+                try:
+                    chunk_count = 0
+                    async for chunk_text in self.client.astream(prompt):
+                        processor.process_chunk(chunk_text)
+                        chunk_count += 1
+                    processor.finalize_processing()
+                    self.batch_stats[index] = {
+                        "batch": index, "keys": len(pair_definitions), "attempts": attempt + 1,
+                        "chunks": chunk_count, "seconds": time.monotonic() - started_at,
+                        "qualified": len(qualified), "ok": True,
+                    }
+                    logger.info(f"Batch {index}: {len(qualified)}/{len(pair_definitions)} "
+                                f"pair(s) qualified in {time.monotonic() - started_at:.2f}s (attempt {attempt + 1}).")
+                    return {p1_key: segment_value(between) for p1_key, between in qualified.items()}
+                except Exception as e:
+                    error = e
+            if attempt < self.max_retries:
+                delay = min(MAX_BACKOFF_SECONDS, self.backoff_seconds * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning(f"Batch {index} failed (attempt {attempt + 1}): {error}. Retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)  # outside the semaphore: other batches keep streaming
+
+        logger.error(f"Batch {index} failed after {self.max_retries + 1} attempt(s): {error}")
+        self.batch_stats[index] = {
+            "batch": index, "keys": len(pair_definitions), "attempts": self.max_retries + 1,
+            "chunks": 0, "seconds": time.monotonic() - started_at, "qualified": 0, "ok": False,
+        }
+        return {}
+
+def translate_subtitle(raw_subtitle_content: str, client, output_directory: str,
+                       config_overrides: Optional[Dict[str, Any]] = None,
+                       **scheduler_options) -> Optional[List[Tuple[str, Optional[str]]]]:
+    """
+    Splits a subtitle file into keyed segments and translates them concurrently.
+
+    Args:
+        raw_subtitle_content: The raw subtitle text (e.g., SRT format).
+        client: Streaming client with `astream(prompt)`.
+        output_directory: Where the qualified pair files are written.
+        config_overrides: Overrides for input_manipulation.DEFAULT_CONFIG.
+        **scheduler_options: TranslationScheduler settings (concurrency, requests_per_minute, ...).
+
+    Returns:
+        [(key, translated text or None), ...] in key order, or None if nothing could be segmented.
+    """
+    structured = process_subtitle_to_structured_data(raw_subtitle_content, config_overrides)
+    if structured is None:
+        return None
+    _, text_array_with_segments = structured
+    scheduler = TranslationScheduler(client, output_directory, **scheduler_options)
+    return asyncio.run(scheduler.run(text_array_with_segments))
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from stream_clients import GeminiStreamClient
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s')
+    load_dotenv()
+
+    api_key_env = os.environ.get("GEMINI_API_KEY")
+    if not api_key_env:
+        logging.error("Error: GEMINI_API_KEY not found in environment variables.")
+        sys.exit(1)
+    if len(sys.argv) < 2:
+        logging.error("Usage: python translation_scheduler.py SUBTITLE_FILE [OUTPUT_JSON]")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as subtitle_file:
+        raw_subtitle = subtitle_file.read()
+    output_json = sys.argv[2] if len(sys.argv) > 2 else "translated_segments.json"
+
+    translated_segments = translate_subtitle(raw_subtitle, GeminiStreamClient(api_key_env),
+                                             "output_pairs_data_scheduled")
+    if translated_segments is not None:
+        with open(output_json, "w", encoding="utf-8") as f:
+            json.dump([{key: text} for key, text in translated_segments], f, ensure_ascii=False, indent=2)
+        logging.info(f"Translated segments written to '{output_json}'")
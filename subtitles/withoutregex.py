@@ -1,8 +1,7 @@
 import os
 import re
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
+from stream_clients import GeminiStreamClient, default_generation_config
 
 # Load environment variables
 load_dotenv()
@@ -117,25 +116,19 @@ def _write_pair_data_to_file(segments_dict, p1_key, p2_key, output_dir):
     print(f"  >> Saved details to '{full_output_path}'")
 
 # --- Main Function ---
-def generate_and_save(input_text, output_filename_base, api_key):
-    if not api_key:
-        print("Error: GEMINI_API_KEY not provided.")
-        return
+def generate_and_save(input_text, output_filename_base, api_key, client=None):
+    # client: anything with stream(prompt), e.g. stream_clients.ReplayClient; replaces the API
+    if client is None:
+        if not api_key:
+            print("Error: GEMINI_API_KEY not provided.")
+            return
 
-    try:
-        client = genai.Client(api_key=api_key)
-    except Exception as e:
-        print(f"Error initializing Google GenAI Client: {e}")
-        return
-
-    model_name = "gemini-2.5-flash-preview-05-20"
-    gen_contents = [types.Content(role="user", parts=[types.Part.from_text(text=input_text)])]
-    gen_config = types.GenerateContentConfig(
-        temperature=1.5, top_p=0.5, candidateCount=1, maxOutputTokens=65000,
-        thinking_config=types.ThinkingConfig(thinking_budget=500),
-        response_mime_type="text/plain",
-        system_instruction=[types.Part.from_text(text="Translate to Vietnamese. Keep `(` and `)`. Output as JSON.")],
-    )
+        try:
+            client = GeminiStreamClient(api_key=api_key, model_name="gemini-2.5-flash-preview-05-20",
+                                        generation_config=default_generation_config())
+        except Exception as e:
+            print(f"Error initializing Google GenAI Client: {e}")
+            return
 
     print(f"Starting content generation for input (first 50 chars): '{input_text[:50]}...'")
     stream_output_file = f"{output_filename_base}_stream.txt"
@@ -156,12 +149,9 @@ def generate_and_save(input_text, output_filename_base, api_key):
     
     try:
         with open(stream_output_file, "w", encoding="utf-8") as f_stream:
-            stream = client.models.generate_content_stream(model=model_name, contents=gen_contents, config=gen_config)
-            for chunk_num, chunk in enumerate(stream):
-                if not chunk.text: continue
-                
-                f_stream.write(chunk.text)
-                cumulative_text += chunk.text
+            for chunk_num, chunk_text in enumerate(client.stream(input_text)):
+                f_stream.write(chunk_text)
+                cumulative_text += chunk_text
                 print(f"\n--- Chunk {chunk_num+1} received ---")
 
                 for k, (p1, p2) in enumerate(target_pairs):